@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+
+# asyncio client for the FreshService API V2
+# Shares every endpoint method with FreshPy; only the request, result and
+# pagination hooks are overridden, so each FreshPy method becomes a coroutine
+# (and each iter_* method an async generator) on AsyncFreshPy.
+# Requires httpx: pip install httpx
+import asyncio
+from collections import deque
+from time import monotonic
+
+from FreshPy import (FreshPy, BulkReport, Catalog, Checkpoint, CATALOG, LAST_LOGIN_FIELD, LastLoginMatcher,
+                     project, diff, _UNCHANGED, _lookup)
+
+try:
+    import httpx
+except(ImportError):
+    httpx = None
+
+
+class AsyncCatalog(Catalog):
+    """
+        Catalog for AsyncFreshPy; lookups are awaited
+    """
+    # optional arg: list of section names(defaults to all of CATALOG)
+    async def load(self, names=None):
+        names = self._stale(names)
+        results = await asyncio.gather(*[getattr(self.fs, CATALOG[name])() for name in names])
+        for name, records in zip(names, results):
+            self._store(name, records)
+
+
+    async def get(self, name):
+        await self.load([name])
+        return self.sections[name][0]
+
+
+    async def ids(self, name):
+        await self.load([name])
+        return self.sections[name][1]
+
+
+    async def names(self, name):
+        await self.load([name])
+        return self.sections[name][2]
+
+
+class AsyncSingleFlight():
+    """
+        SingleFlight for coroutines: concurrent awaits of the same key share
+        the first caller's run
+    """
+    def __init__(self):
+        self.calls = {}
+
+
+    # arg: hashable key for the call; coroutine function to run
+    # return: result of func, shared by every caller with the same key
+    async def do(self, key, func):
+        future = self.calls.get(key)
+        if(future!=None): return await asyncio.shield(future)
+        future = self.calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await func()
+        except(asyncio.CancelledError):
+            future.cancel()
+            raise
+        except(Exception) as e:
+            future.set_exception(e)
+            future.exception()  # retrieved, so a future nobody waited on doesn't warn
+            raise
+        finally:
+            del self.calls[key]
+        future.set_result(result)
+        return result
+
+
+class AsyncFreshPy(FreshPy):
+    """
+        Takes api key and custom domain of freshservice instance as arguments
+        Same optional arguments and methods as FreshPy; await every call,
+        `async for` over iter_* and close with `await close()` or `async with`
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.catalog = AsyncCatalog(self, self.catalog.ttl)
+        if(self.flights!=None): self.flights = AsyncSingleFlight()
+        # per-lane asyncio gates, made on first use; the Scheduler's own gates block threads
+        self.gates = {}
+
+
+    # args: FreshService API Key and FreshService domain URL
+    # return: httpx.AsyncClient with a shared keep-alive connection pool
+    def _session(self, pool_size, headers):
+        if(httpx==None): raise ImportError("AsyncFreshPy requires httpx: pip install httpx")
+        default_headers = {'Accept':'application/json'}
+        if(headers!=None): default_headers.update(headers)
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        return httpx.AsyncClient(auth=(self.key,''), headers=default_headers,
+                                 limits=limits, timeout=self.timeout)
+
+
+    async def close(self):
+        await self.session.aclose()
+
+
+    async def __aenter__(self):
+        return self
+
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+    #------------------- Raw API Requests -------------------#
+    # arg: HTTP method; API URI; accepted status codes; extra httpx kwargs
+    # return: httpx.Response object
+    async def _request(self, method, uri, ok=(200,), **kwargs):
+        attempt = 0
+        started = monotonic()
+        waited = 0.0
+        lane = self._lane()
+        concurrency, share = self.scheduler.lane(lane)
+        gate = None
+        if(concurrency!=None): gate = self.gates.setdefault(lane, asyncio.Semaphore(concurrency))
+        if(gate!=None): await gate.acquire()
+        try:
+            while(True):
+                waited += await self._acquire(share)
+                response, error = None, None
+                try:
+                    response = await self.session.request(method, uri, **kwargs)
+                except(httpx.TransportError) as e:
+                    error = e
+                wait = self._retry_wait(method, response, error, attempt)
+                if(wait==None): break
+                await asyncio.sleep(wait)
+                waited += wait
+                attempt += 1
+        finally:
+            if(gate!=None): gate.release()
+        self._emit(method, uri, response, error, attempt, monotonic() - started, waited, lane=lane)
+        if(error!=None): raise error
+        self._invalidate(method, uri)
+        return self._check(response, ok)
+
+
+    # arg: share(0-1) of the rate budget the lane may use
+    # return: seconds waited on the rate limiter
+    async def _acquire(self, share):
+        if(share >= 1):
+            wait = self.limiter.reserve()
+            if(wait > 0): await asyncio.sleep(wait)
+            return wait
+        waited = 0.0
+        while(True):
+            wait = self.limiter.poll(share=share)
+            if(wait<=0): return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+
+    # stream is accepted for FreshPy compatibility; httpx bodies are read eagerly
+    # arg: API URI
+    # return: httpx.Response object, shared by concurrent identical GETs
+    async def _get(self, uri, stream=False):
+        if(self.flights==None): return await self._get_cached(uri)
+        return await self.flights.do(('GET', self._lane(), uri), lambda: self._get_cached(uri))
+
+
+    # arg: API URI
+    # return: httpx.Response object, from the response cache when one is configured
+    async def _get_cached(self, uri):
+        if(self.cache==None or not self.cache.cacheable(uri)): return await self._request('GET', uri)
+        response, headers = self.cache.lookup(uri)
+        if(response!=None): return response
+        response = self.cache.store(uri, await self._request('GET', uri, ok=(200,304), headers=headers))
+        if(response.status_code==304): return await self._request('GET', uri)  # evicted meanwhile
+        return response
+
+
+    # arg: HTTP method; API URI
+    # optional args: json data; json key to return; message to return instead
+    # return: json for key, whole json or message
+    async def _call(self, method, uri, data=None, key=None, message=None):
+        response = await self._send(method, uri, data)
+        return self._result(response, key, message)
+
+
+    # arg: async generator of records
+    # return: list of records
+    async def _collect(self, records):
+        return [record async for record in records]
+
+
+    #------------------- Pagination -------------------#
+    # arg: API URI of first page; json key holding the records
+    # optional args: workers(integer) to fetch pages concurrently instead;
+    #                checkpoint(Checkpoint or file path) to resume an interrupted pull
+    # return: async generator of record lists, one per page
+    async def _iter_pages(self, uri, key, workers=None, checkpoint=None, fields=None):
+        if(checkpoint!=None):
+            async for records in self._iter_pages_checkpointed(uri, key, checkpoint, fields):
+                yield records
+            return
+        if(workers!=None and workers > 1):
+            async for records in self._iter_pages_parallel(uri, key, workers, fields):
+                yield records
+            return
+        next_page = uri
+        while(next_page!=None):
+            records, next_page = await self._read_page(next_page, key, fields)
+            yield records
+
+
+    # arg: API URI of a page; json key holding the records
+    # optional arg: list of field names to keep
+    # return: (list of records, next page URI or None)
+    async def _read_page(self, uri, key, fields=None):
+        response = await self._get(uri)
+        records = self.loads(response.content)[key]
+        if(fields!=None): records = project(records, fields)
+        return records, self._paginate(response)
+
+
+    # arg: API URI of first page; json key holding the records; Checkpoint or file path
+    # return: async generator of record lists, one per page
+    async def _iter_pages_checkpointed(self, uri, key, checkpoint, fields=None):
+        if(not isinstance(checkpoint, Checkpoint)): checkpoint = Checkpoint(checkpoint)
+        next_page = uri
+        for records, next_page in checkpoint.pages():
+            yield records
+        while(next_page!=None):
+            records, next_page = await self._read_page(next_page, key, fields)
+            checkpoint.save(records, next_page)
+            yield records
+        # the last page has been handed over; the next pull starts from the first page
+        checkpoint.clear()
+
+
+    # arg: API URI of first page; json key holding the records; workers(integer)
+    # return: async generator of record lists in page order
+    async def _iter_pages_parallel(self, uri, key, workers, fields=None):
+        records, next_page = await self._read_page(uri, key, fields)
+        yield records
+        if(next_page==None): return
+        per_page = len(records)
+        pending = deque()
+        number = 2
+        try:
+            for i in range(workers):
+                pending.append(asyncio.ensure_future(self._fetch_page(uri, key, number, fields)))
+                number += 1
+            while(pending):
+                records = await pending.popleft()
+                if(records): yield records
+                if(len(records) < per_page): return
+                pending.append(asyncio.ensure_future(self._fetch_page(uri, key, number, fields)))
+                number += 1
+        finally:
+            for task in pending: task.cancel()
+
+
+    # arg: API URI of first page; json key holding the records; page number(integer)
+    # return: list of records on that page
+    async def _fetch_page(self, uri, key, number, fields=None):
+        return (await self._read_page(self._page_uri(uri, number), key, fields))[0]
+
+
+    # arg: API URI of first page; json key holding the records
+    # optional args: workers(integer) to fetch pages concurrently; checkpoint(Checkpoint or path)
+    #                fields(list of field names to keep)
+    # return: async generator of records
+    async def _iter_records(self, uri, key, workers=None, checkpoint=None, fields=None):
+        async for page in self._iter_pages(uri, key, workers, checkpoint, fields):
+            for record in page:
+                yield record
+
+
+    #------------------- Bulk Calls -------------------#
+    # arg: endpoint coroutine method; iterable of argument tuples
+    # optional arg: concurrent writes(integer)
+    # return: BulkReport
+    async def _bulk(self, func, items, workers=8):
+        report = BulkReport()
+        gate = asyncio.Semaphore(workers)
+        async def run(args):
+            async with gate:
+                return await func(*args)
+        jobs = [(args, asyncio.ensure_future(run(args))) for args in items]
+        for args, task in jobs:
+            try:
+                result = await task
+            except(Exception) as e:
+                report.failed.append((args, e))
+                continue
+            if(result is _UNCHANGED): report.skipped.append(args)
+            else: report.succeeded.append((args, result))
+        return report
+
+
+    # arg: update coroutine method; view coroutine method; {record id: record json}; record id; desired data
+    # return: update response json or _UNCHANGED
+    async def _apply_one(self, update, view, index, record_id, data):
+        record = _lookup(index, record_id)
+        if(record==None): record = await view(record_id, data)
+        changes = diff(record, data)
+        if(not changes): return _UNCHANGED
+        return await update(record_id, changes)
+
+
+    #------------------- Author Specific Functions -------------------#
+    # awaited through lastUser2usedBy_staff/lastUser2usedBy_students
+    async def _lastUser2usedBy(self, asset, requester_list, by, field):
+        matcher = requester_list
+        if(not isinstance(matcher, LastLoginMatcher)):
+            matcher = LastLoginMatcher(requester_list, by, field)
+        for display_id, data in matcher.changes([asset]):
+            response = await self.update_asset(display_id, data)
+            print(response)
+
+
+    # assets may also be an async generator, e.g. iter_assets(type_fields=True)
+    # return: BulkReport, see FreshPy.assign_last_users
+    async def assign_last_users(self, assets, requester_list, by='name', field=LAST_LOGIN_FIELD, workers=8):
+        matcher = LastLoginMatcher(requester_list, by, field)
+        if(hasattr(assets, '__aiter__')): assets = await self._collect(assets)
+        else: assets = list(assets)
+        return await self.apply_assets(matcher.desired(assets), assets, workers)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+# freshpy command line tool for bulk jobs
+# Credentials come from --api-key/--domain or the FRESHSERVICE_API_KEY and
+# FRESHSERVICE_DOMAIN environment variables.
+#   freshpy --workers 8 export assets assets.csv.gz --type-fields --query "asset_type_id:17000025"
+#   freshpy --rate-limit 400 bulk-update assets changes.csv --checkpoint done.txt
+#   freshpy sync-last-user --group 17000056500 --asset-type Laptop --dry-run
+# Modules are imported by the subcommand that needs them so --help and
+# argument errors return immediately.
+import argparse
+import os
+import sys
+
+# resource: (FreshPy iterator, FreshPy bulk update method)
+RESOURCES = {
+    'tickets': ('iter_tickets', 'bulk_update_tickets'),
+    'requesters': ('iter_requesters', 'bulk_update_requesters'),
+    'agents': ('iter_agents', None),
+    'assets': ('iter_assets', 'bulk_update_assets'),
+}
+
+# resource: (FreshPy apply method, FreshPy iterator of the current records, its keyword args, id key)
+APPLY = {
+    'requesters': ('apply_requesters', 'iter_requesters', {}, 'id'),
+    'assets': ('apply_assets', 'iter_assets', {'type_fields': True}, 'display_id'),
+}
+
+
+# arg: parsed arguments
+# return: FreshPy instance
+def client(args):
+    from FreshPy import FreshPy, SharedRateLimiter
+    if(not args.api_key or not args.domain):
+        sys.exit("freshpy: set --api-key and --domain or FRESHSERVICE_API_KEY and FRESHSERVICE_DOMAIN")
+    limiter = SharedRateLimiter(args.budget_file, args.rate_limit) if args.budget_file else None
+    return FreshPy(args.api_key, args.domain.rstrip('/'), pool_size=max(10, args.workers),
+                   timeout=args.timeout, rate_limit=args.rate_limit, limiter=limiter)
+
+
+#------------------- export -------------------#
+def export(args):
+    from FreshExport import export, print_progress
+    if(args.updated_since and args.resource!='tickets'): sys.exit("freshpy: --updated-since is for tickets only")
+    if(args.type_fields and args.resource!='assets'): sys.exit("freshpy: --type-fields is for assets only")
+    if(args.query and args.resource=='agents'): sys.exit("freshpy: agents cannot be filtered with --query")
+    fs = client(args)
+    kwargs = {'workers': args.workers, 'checkpoint': args.checkpoint}
+    if(args.fields): kwargs['fields'] = args.fields.split(',')
+    if(args.query): kwargs['query'] = args.query
+    if(args.updated_since): kwargs['updated_since'] = args.updated_since
+    if(args.type_fields): kwargs['type_fields'] = True
+    records = getattr(fs, RESOURCES[args.resource][0])(**kwargs)
+    count = export(records, args.output, format=args.format, compression=args.compression,
+                   progress=print_progress if args.progress else None)
+    print("Exported {0} {1} to {2}".format(count, args.resource, args.output))
+
+
+#------------------- bulk-update -------------------#
+# Rows are sent in chunks; with --checkpoint the ids of each finished chunk are
+# appended to a file and skipped when the job is run again. With --skip-unchanged
+# the current records are listed and indexed once and only changed fields are sent
+def bulk_update(args):
+    import json
+    from FreshExport import read_records
+    method = RESOURCES[args.resource][1]
+    if(method==None): sys.exit("freshpy: {} cannot be bulk updated".format(args.resource))
+    if(args.skip_unchanged and args.resource not in APPLY):
+        sys.exit("freshpy: --skip-unchanged is for {}".format(' and '.join(sorted(APPLY))))
+    # assets are updated by display_id, which is not their id
+    id_column = args.id_column or ('display_id' if args.resource=='assets' else 'id')
+    if(args.resource=='assets' and id_column=='id'):
+        sys.exit("freshpy: assets are updated by display_id, not id; use --id-column display_id")
+    done = set()
+    if(args.checkpoint and os.path.exists(args.checkpoint)):
+        with open(args.checkpoint) as f:
+            done = {line.strip() for line in f if line.strip()}
+    fs = None if args.dry_run else client(args)
+    current = None
+    if(args.skip_unchanged and fs!=None):
+        method, lister, kwargs, key = APPLY[args.resource]
+        current = {record[key]: record for record in getattr(fs, lister)(workers=args.workers, **kwargs)}
+
+    updated, failed, skipped, unchanged = 0, 0, 0, 0
+    chunk = []
+    def flush():
+        nonlocal updated, failed, unchanged
+        if(not chunk): return
+        if(current!=None): report = getattr(fs, method)(chunk, current, args.workers)
+        else: report = getattr(fs, method)(chunk, args.workers)
+        updated += len(report.succeeded)
+        failed += len(report.failed)
+        unchanged += len(report.skipped)
+        for (record_id, data), error in report.failed:
+            print("{0} {1}: {2}".format(args.resource, record_id, error), file=sys.stderr)
+        if(args.checkpoint):
+            with open(args.checkpoint, 'a') as f:
+                f.writelines(str(record_id) + '\n' for (record_id, data), result in report.succeeded)
+                f.writelines(str(record_id) + '\n' for record_id, data in report.skipped)
+        del chunk[:]
+
+    for row, record in enumerate(read_records(args.input, args.format), 1):
+        if(id_column not in record):
+            print("row {0}: no {1} column, skipped".format(row, id_column), file=sys.stderr)
+            failed += 1
+            continue
+        record_id = record.pop(id_column)
+        if(str(record_id) in done or not record):
+            skipped += 1
+            continue
+        if(args.dry_run):
+            print("{0} {1}: {2}".format(args.resource, record_id, json.dumps(record)))
+            continue
+        chunk.append((record_id, record))
+        if(len(chunk) >= args.chunk): flush()
+    if(not args.dry_run): flush()
+    print("Updated {0}, failed {1}, skipped {2}, unchanged {3}".format(updated, failed, skipped, unchanged))
+    return 1 if failed else 0
+
+
+#------------------- sync-last-user -------------------#
+def sync_last_user(args):
+    from FreshPy import LastLoginMatcher, where
+    fs = client(args)
+    type_id = fs.catalog.ids('asset_types').get(args.asset_type)
+    if(type_id==None): sys.exit("freshpy: unknown asset type: {}".format(args.asset_type))
+    assets = fs.list_assets(type_fields=True, workers=args.workers, query=where(asset_type_id=type_id))
+    requesters = fs.requester_group_members(args.group, workers=args.workers)
+    kwargs = {'field': args.field} if args.field else {}
+    if(args.dry_run):
+        matcher = LastLoginMatcher(requesters, by=args.by, **kwargs)
+        changes = list(matcher.changes(assets))
+        for display_id, data in changes:
+            print("asset {0}: user_id {1}".format(display_id, data['user_id']))
+        print("{0} of {1} assets would change".format(len(changes), len(assets)))
+        return 0
+    report = fs.assign_last_users(assets, requesters, by=args.by, workers=args.workers, **kwargs)
+    for (display_id, data), error in report.failed:
+        print("asset {0}: {1}".format(display_id, error), file=sys.stderr)
+    print("Updated {0} of {1} assets, {2} failed, {3} already assigned".format(
+        len(report.succeeded), len(assets), len(report.failed), len(report.skipped)))
+    return 0 if report.ok else 1
+
+
+# return: argparse.ArgumentParser
+def parser():
+    main = argparse.ArgumentParser(prog='freshpy', description='Bulk jobs against the FreshService API V2')
+    main.add_argument('--api-key', default=os.environ.get('FRESHSERVICE_API_KEY'))
+    main.add_argument('--domain', default=os.environ.get('FRESHSERVICE_DOMAIN'),
+                      help='e.g. https://customdomain.freshservice.com')
+    main.add_argument('--workers', type=int, default=4, help='concurrent requests(default 4)')
+    main.add_argument('--rate-limit', type=int, default=None,
+                      help='requests per minute to stay under(read from the API if unset)')
+    main.add_argument('--budget-file', default=os.environ.get('FRESHPY_BUDGET_FILE'),
+                      help='SQLite file sharing the rate budget with other freshpy processes')
+    main.add_argument('--timeout', type=float, default=60, help='seconds per request')
+    commands = main.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('export', help='stream a collection to NDJSON, CSV or Parquet')
+    p.add_argument('resource', choices=sorted(RESOURCES))
+    p.add_argument('output', help='file path; format and compression follow the extension')
+    p.add_argument('--format', choices=('ndjson', 'csv', 'parquet'))
+    p.add_argument('--compression')
+    p.add_argument('--fields', help='comma separated fields to keep, dotted for nested keys')
+    p.add_argument('--query', help='server side filter, e.g. "status:2 AND priority:>3"(not agents)')
+    p.add_argument('--updated-since', help='tickets only: ISO 8601 timestamp')
+    p.add_argument('--type-fields', action='store_true', help='assets only: include type_fields')
+    p.add_argument('--checkpoint', help='file to resume an interrupted export from')
+    p.add_argument('--progress', action='store_true')
+    p.set_defaults(func=export)
+
+    p = commands.add_parser('bulk-update', help='update records from a CSV or NDJSON file')
+    p.add_argument('resource', choices=sorted(name for name, spec in RESOURCES.items() if spec[1]))
+    p.add_argument('input', help='one row per record: the id column plus the fields to set')
+    p.add_argument('--format', choices=('ndjson', 'csv'))
+    p.add_argument('--id-column', help='column holding the record id(default display_id for assets, id otherwise)')
+    p.add_argument('--checkpoint', help='file of finished ids, skipped when run again')
+    p.add_argument('--chunk', type=int, default=500, help='rows per checkpointed chunk')
+    p.add_argument('--skip-unchanged', action='store_true',
+                   help='list the current records first and only send fields that differ')
+    p.add_argument('--dry-run', action='store_true', help='print the updates instead of sending them')
+    p.set_defaults(func=bulk_update)
+
+    p = commands.add_parser('sync-last-user', help="set assets' Used By from their last login")
+    p.add_argument('--group', type=int, required=True, help='requester group to match last logins against')
+    p.add_argument('--asset-type', default='Laptop')
+    p.add_argument('--by', choices=('name', 'email'), default='name')
+    p.add_argument('--field', help='last login type field(defaults to FreshPy.LAST_LOGIN_FIELD)')
+    p.add_argument('--dry-run', action='store_true', help='print the changes instead of sending them')
+    p.set_defaults(func=sync_last_user)
+    return main
+
+
+# optional arg: argument list(defaults to sys.argv)
+# return: exit status
+def main(argv=None):
+    args = parser().parse_args(argv)
+    from FreshPy import FreshPyError
+    try:
+        return args.func(args) or 0
+    except(FreshPyError) as e:
+        print("freshpy: {0} from {1}".format(e, e.response.url), file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+
+# Streaming exports of FreshPy collections to NDJSON, CSV or Parquet
+# Records go from the paginator straight to the writer, so memory stays flat
+# no matter how many tickets or assets are exported.
+#   export(FS.iter_assets(type_fields=True), 'assets.csv.gz', progress=print_progress)
+# Parquet requires pyarrow: pip install pyarrow
+# read_records() reads NDJSON or CSV files back, e.g. as input for bulk updates.
+# to_arrow()/to_dataframe() load a collection into columns for analysis(requires
+# pyarrow, and pandas for DataFrames):
+#   df = to_dataframe(FS.iter_assets(type_fields=True))
+#   laptops = df[df['asset_type_id']==laptop_id]
+import re
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+import tempfile
+
+# pyarrow is imported on first Parquet use; it takes longer to import than everything else here
+pyarrow = None
+
+# file extension: compression
+COMPRESSION = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz'}
+OPENERS = {'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+
+# columns dictionary encoded by to_arrow(categoricals in pandas); matched against the last
+# part of a dotted column with any asset type suffix removed(type_fields.asset_state_17000025)
+CATEGORIES = ('status', 'type', 'asset_state', 'asset_type_id', 'department', 'department_id',
+              'priority', 'source', 'impact', 'usage_type')
+TYPE_SUFFIX = re.compile(r'_\d+$')
+TIMESTAMP = '%Y-%m-%dT%H:%M:%SZ'
+
+
+# Nested objects such as type_fields become dotted columns; lists are kept as json
+# arg: record json
+# optional arg: prefix for nested keys
+# return: flat dict
+def flatten(record, prefix=''):
+    flat = {}
+    for key, value in record.items():
+        name = prefix + key
+        if(isinstance(value, dict)): flat.update(flatten(value, name + '.'))
+        elif(isinstance(value, list)): flat[name] = json.dumps(value)
+        else: flat[name] = value
+    return flat
+
+
+# Reverses flatten: dotted keys become nested objects
+# arg: flat dict
+# return: record json
+def unflatten(row):
+    record = {}
+    for name, value in row.items():
+        node = record
+        parts = name.split('.')
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+    return record
+
+
+# arg: records written; bytes written
+def print_progress(records, written):
+    print("{0} records, {1:.1f} MiB".format(records, written / 1048576.0))
+
+
+class _Counter(io.RawIOBase):
+    """
+        Binary file wrapper counting the bytes that reach disk
+    """
+    def __init__(self, f):
+        self.f = f
+        self.written = 0
+
+
+    def writable(self):
+        return True
+
+
+    def write(self, data):
+        self.written += len(data)
+        return self.f.write(data)
+
+
+    def close(self):
+        self.f.close()
+        super().close()
+
+
+class NDJSONWriter():
+    """
+        One json record per line
+    """
+    # arg: text stream
+    def __init__(self, stream):
+        self.stream = stream
+
+
+    def write(self, record):
+        self.stream.write(json.dumps(record) + '\n')
+
+
+    def close(self):
+        self.stream.close()
+
+
+class CSVWriter():
+    """
+        Flattened records as CSV. Columns come from the first `sample` records
+        unless given; keys first seen after that are left out
+    """
+    # arg: text stream
+    # optional args: columns(list); sample(records buffered to find columns)
+    def __init__(self, stream, columns=None, sample=1000):
+        self.stream = stream
+        self.columns = columns
+        self.sample = sample
+        self.buffer = []
+        self.writer = None
+
+
+    def write(self, record):
+        if(self.writer!=None):
+            self.writer.writerow(flatten(record))
+            return
+        self.buffer.append(flatten(record))
+        if(len(self.buffer) >= self.sample): self._start()
+
+
+    def _start(self):
+        columns = self.columns
+        if(columns==None):
+            columns = []
+            seen = set()
+            for row in self.buffer:
+                for name in row:
+                    if(name not in seen):
+                        seen.add(name)
+                        columns.append(name)
+        self.writer = csv.DictWriter(self.stream, columns, extrasaction='ignore')
+        self.writer.writeheader()
+        self.writer.writerows(self.buffer)
+        self.buffer = []
+
+
+    def close(self):
+        if(self.writer==None): self._start()
+        self.stream.close()
+
+
+class ParquetWriter():
+    """
+        Flattened records as Parquet row groups of `batch` records. Rows are
+        spooled to a temporary file while the column types are collected and
+        written on close with one schema for the whole file: columns first seen
+        in a later batch are kept, ints mixed with floats become doubles and
+        any other mix of types, or a column that is always null, becomes strings
+    """
+    # arg: binary stream
+    # optional args: batch(records per row group); compression(parquet codec)
+    def __init__(self, stream, batch=10000, compression='snappy'):
+        _import_pyarrow()
+        self.stream = stream
+        self.batch = batch
+        self.compression = compression
+        self.rows = []
+        self.types = {}  # column: pyarrow type of the values seen so far
+        self.spool = tempfile.TemporaryFile('w+', encoding='utf-8')
+
+
+    def write(self, record):
+        self.rows.append(flatten(record))
+        if(len(self.rows) >= self.batch): self._spill()
+
+
+    # Folds the batch's column types into self.types and moves its rows to the spool
+    def _spill(self):
+        columns = {}
+        for row in self.rows:
+            for name, value in row.items():
+                columns.setdefault(name, []).append(value)
+        for name, values in columns.items():
+            self.types[name] = _promote(self.types.get(name), _infer(values))
+        for row in self.rows:
+            self.spool.write(json.dumps(row) + '\n')
+        self.rows = []
+
+
+    # Stringifies values in string columns so mixed columns fit the schema
+    # arg: list of flat rows; schema
+    # return: list of flat rows
+    def _conform(self, rows, schema):
+        strings = [f.name for f in schema if pyarrow.types.is_string(f.type)]
+        for row in rows:
+            for name in strings:
+                value = row.get(name)
+                if(value!=None and not isinstance(value, str)): row[name] = str(value)
+        return rows
+
+
+    def close(self):
+        self._spill()
+        try:
+            if(not self.types): return
+            schema = pyarrow.schema([pyarrow.field(name, pyarrow.string() if pyarrow.types.is_null(kind) else kind)
+                                     for name, kind in self.types.items()])
+            writer = pyarrow.parquet.ParquetWriter(self.stream, schema, compression=self.compression)
+            self.spool.seek(0)
+            rows = []
+            for line in self.spool:
+                rows.append(json.loads(line))
+                if(len(rows) >= self.batch):
+                    writer.write_table(pyarrow.Table.from_pylist(self._conform(rows, schema), schema=schema))
+                    rows = []
+            if(rows): writer.write_table(pyarrow.Table.from_pylist(self._conform(rows, schema), schema=schema))
+            writer.close()
+        finally:
+            self.spool.close()
+            self.stream.close()
+
+
+# arg: list of column values
+# return: pyarrow type they convert to, string if they do not share one
+def _infer(values):
+    try:
+        return pyarrow.array(values).type
+    except(pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+        return pyarrow.string()
+
+
+# arg: column type so far(None for a new column); type of a new batch
+# return: type holding both without loss
+def _promote(kind, other):
+    if(kind==None or pyarrow.types.is_null(kind)): return other
+    if(pyarrow.types.is_null(other) or kind==other): return kind
+    if(all(pyarrow.types.is_integer(t) or pyarrow.types.is_floating(t) for t in (kind, other))):
+        return pyarrow.float64()
+    return pyarrow.string()
+
+
+def _import_pyarrow():
+    global pyarrow
+    if(pyarrow!=None): return
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.parquet
+    except(ImportError):
+        raise ImportError("Parquet export and to_arrow() require pyarrow: pip install pyarrow")
+
+
+#------------------- Columnar -------------------#
+class _Columns():
+    """
+        Flattened records appended straight into one list per column; a
+        column first seen late is padded with None for the earlier rows and
+        a record missing columns gets None in them
+    """
+    def __init__(self):
+        self.columns = {}
+        self.rows = 0
+
+
+    # arg: record json
+    def add(self, record):
+        added = self._add(record, '')
+        self.rows += 1
+        if(added!=len(self.columns)):
+            for column in self.columns.values():
+                if(len(column) < self.rows): column.append(None)
+
+
+    # arg: record json or nested object; prefix for nested keys
+    # return: number of values appended
+    def _add(self, record, prefix):
+        columns = self.columns
+        added = 0
+        for key, value in record.items():
+            name = prefix + key
+            if(isinstance(value, dict)):
+                added += self._add(value, name + '.')
+                continue
+            if(isinstance(value, list)): value = json.dumps(value)
+            column = columns.get(name)
+            if(column==None): column = columns[name] = [None] * self.rows
+            column.append(value)
+            added += 1
+        return added
+
+
+# Builds an Arrow array for one column: types are inferred, columns of mixed
+# types become strings, ISO 8601 timestamps become UTC timestamps and category
+# columns are dictionary encoded
+# arg: column name; list of values; category names
+# return: pyarrow.Array
+def _array(name, values, categories):
+    try:
+        array = pyarrow.array(values)
+    except(pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+        array = pyarrow.array([str(value) if value!=None else None for value in values], pyarrow.string())
+    if(pyarrow.types.is_string(array.type) and array.null_count < len(array)):
+        stamps = pyarrow.compute.strptime(array, format=TIMESTAMP, unit='s', error_is_null=True)
+        if(stamps.null_count==array.null_count): array = stamps.cast(pyarrow.timestamp('s', tz='UTC'))
+    if(TYPE_SUFFIX.sub('', name.rsplit('.', 1)[-1]) in categories and not pyarrow.types.is_timestamp(array.type)):
+        array = array.dictionary_encode()
+    return array
+
+
+# Consumes records as the pages arrive into one list per column; no per-record
+# dicts are kept. Nested objects such as type_fields become dotted columns
+# arg: iterable of record jsons(e.g. FS.iter_assets(type_fields=True))
+# optional arg: column names to dictionary encode(see CATEGORIES)
+# return: pyarrow.Table
+def to_arrow(records, categories=CATEGORIES):
+    _import_pyarrow()
+    columns = _Columns()
+    for record in records:
+        columns.add(record)
+    data = columns.columns
+    categories = set(categories)
+    names = list(data)
+    arrays = [_array(name, data.pop(name), categories) for name in names]
+    return pyarrow.Table.from_arrays(arrays, names=names)
+
+
+# Category columns become pandas categoricals and timestamps datetime64[ns, UTC],
+# so filters such as df[df['status']==2] run vectorized
+# arg: iterable of record jsons
+# optional arg: column names to make categorical(see CATEGORIES)
+# return: pandas.DataFrame
+def to_dataframe(records, categories=CATEGORIES):
+    try:
+        import pandas
+    except(ImportError):
+        raise ImportError("DataFrames require pandas and pyarrow: pip install pandas pyarrow")
+    return to_arrow(records, categories).to_pandas()
+
+
+# arg: file path
+# return: (format, compression or None) from the file extension
+def _detect(path):
+    compression = None
+    for extension, codec in COMPRESSION.items():
+        if(path.endswith(extension)):
+            path = path[:-len(extension)]
+            compression = codec
+    format = path.rsplit('.', 1)[-1].lower()
+    if(format=='jsonl'): format = 'ndjson'
+    return format, compression
+
+
+# Reads records back one at a time. CSV cells are decoded as json where they
+# parse(numbers, true/false, null, lists), empty cells are left out and dotted
+# columns become nested objects, so an exported CSV can be edited and read back
+# arg: NDJSON or CSV path, optionally .gz/.bz2/.xz
+# optional arg: format('ndjson' or 'csv', taken from the extension if None)
+# return: generator of record jsons
+def read_records(path, format=None):
+    detected, compression = _detect(path)
+    if(format==None): format = detected
+    if(format not in ('ndjson', 'csv')): raise ValueError("Unknown input format: {}".format(format))
+    opener = OPENERS.get(compression, open)
+    with opener(path, 'rt', encoding='utf-8', newline='') as f:
+        if(format=='ndjson'):
+            for line in f:
+                if(line.strip()): yield json.loads(line)
+            return
+        for row in csv.DictReader(f):
+            yield unflatten({name: _cell(value) for name, value in row.items() if value!=''})
+
+
+# arg: CSV cell(string)
+# return: json value if the cell parses as one, else the string
+def _cell(value):
+    try:
+        return json.loads(value)
+    except(ValueError):
+        return value
+
+
+# Writes records to path as they arrive
+# arg: iterable of record jsons(e.g. FS.iter_tickets()); output path
+# optional args: format('ndjson', 'csv' or 'parquet', taken from the extension if None)
+#                compression('gzip', 'bz2', 'xz' for ndjson/csv, a parquet codec for parquet;
+#                taken from the extension if None); progress(function(records, bytes));
+#                every(records between progress calls); writer options, e.g. columns=
+# return: number of records written
+def export(records, path, format=None, compression=None, progress=None, every=1000, **options):
+    detected, codec = _detect(path)
+    if(format==None): format = detected
+    if(format=='jsonl'): format = 'ndjson'
+    if(compression==None): compression = codec
+    if(format not in ('ndjson', 'csv', 'parquet')): raise ValueError("Unknown export format: {}".format(format))
+
+    raw = _Counter(open(path, 'wb'))
+    if(format=='parquet'):
+        writer = ParquetWriter(raw, compression=compression or 'snappy', **options)
+    else:
+        stream = raw
+        if(compression=='gzip'): stream = gzip.GzipFile(fileobj=raw, mode='wb')
+        elif(compression=='bz2'): stream = bz2.BZ2File(raw, 'wb')
+        elif(compression=='xz'): stream = lzma.LZMAFile(raw, 'wb')
+        elif(compression!=None): raise ValueError("Unknown compression: {}".format(compression))
+        text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        writer = NDJSONWriter(text) if(format=='ndjson') else CSVWriter(text, **options)
+
+    count = 0
+    try:
+        for record in records:
+            writer.write(record)
+            count += 1
+            if(progress!=None and count % every==0): progress(count, raw.written)
+    finally:
+        writer.close()
+        raw.close()
+    if(progress!=None): progress(count, raw.written)
+    return count
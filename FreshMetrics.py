@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+# Per-endpoint request metrics for FreshPy
+# RequestMetrics is a FreshPy hook: it counts every request event by method,
+# endpoint template and status, keeps a latency histogram per endpoint and the
+# last remaining rate budget, and renders them in Prometheus text format.
+#   metrics = RequestMetrics()
+#   FS = FreshPy(key, domain, hooks=[metrics])
+#   ...
+#   print(metrics.prometheus())          # or metrics.write('/var/lib/node_exporter/freshpy.prom')
+#   for row in metrics.summary()[:5]: print(row)   # endpoints with the most total time
+import os
+from threading import Lock
+
+# latency histogram upper bounds in seconds
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class RequestMetrics():
+    """
+        Aggregates FreshPy request events into counters and latency histograms
+        per (method, endpoint). Thread safe; one instance may be shared by
+        several FreshPy/AsyncFreshPy clients
+    """
+    # optional arg: histogram bucket upper bounds(seconds)
+    def __init__(self, buckets=BUCKETS):
+        self.lock = Lock()
+        self.buckets = tuple(sorted(buckets))
+        self.reset()
+
+
+    def reset(self):
+        with self.lock:
+            self.requests = {}    # (method, endpoint, status): count
+            self.endpoints = {}   # (method, endpoint): [count, errors, retries, bytes, seconds, waited, max]
+            self.histograms = {}  # (method, endpoint): per-bucket counts, last one is +Inf
+            self.remaining = None
+
+
+    # arg: request event dict from FreshPy._emit
+    def __call__(self, event):
+        name = (event['method'], event['endpoint'])
+        status = event['status'] if event['status']!=None else 'error'
+        duration = event['duration']
+        failed = event['error']!=None or event['status'] >= 400
+        with self.lock:
+            key = name + (status,)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            totals = self.endpoints.get(name)
+            if(totals==None):
+                totals = self.endpoints[name] = [0, 0, 0, 0, 0.0, 0.0, 0.0]
+                self.histograms[name] = [0] * (len(self.buckets) + 1)
+            totals[0] += 1
+            totals[1] += failed
+            totals[2] += event['retries']
+            totals[3] += event['bytes']
+            totals[4] += duration
+            totals[5] += event['waited']
+            totals[6] = max(totals[6], duration)
+            counts = self.histograms[name]
+            for i, bound in enumerate(self.buckets):
+                if(duration <= bound):
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            if(event['remaining']!=None): self.remaining = event['remaining']
+
+
+    # return: list of per-endpoint dicts, endpoints with the most total time first
+    def summary(self):
+        with self.lock:
+            rows = []
+            for (method, endpoint), totals in self.endpoints.items():
+                count, errors, retries, size, seconds, waited, longest = totals
+                rows.append({
+                    'method': method, 'endpoint': endpoint, 'count': count, 'errors': errors,
+                    'retries': retries, 'bytes': size, 'seconds': seconds, 'waited': waited,
+                    'mean': seconds / count, 'max': longest,
+                    'p50': self._quantile(self.histograms[(method, endpoint)], 0.5),
+                    'p95': self._quantile(self.histograms[(method, endpoint)], 0.95),
+                })
+        rows.sort(key=lambda row: row['seconds'], reverse=True)
+        return rows
+
+
+    # Upper bound of the bucket holding the quantile, inf past the last bucket
+    # arg: bucket counts; quantile(0-1)
+    # return: seconds(float)
+    def _quantile(self, counts, q):
+        target = q * sum(counts)
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            seen += count
+            if(seen >= target): return bound
+        return float('inf')
+
+
+    # optional arg: metric name prefix
+    # return: metrics in Prometheus text exposition format(string)
+    def prometheus(self, prefix='freshpy'):
+        lines = []
+        def metric(name, kind, text):
+            lines.append('# HELP {0}_{1} {2}'.format(prefix, name, text))
+            lines.append('# TYPE {0}_{1} {2}'.format(prefix, name, kind))
+        with self.lock:
+            metric('requests_total', 'counter', 'FreshService API requests by endpoint and final status.')
+            for (method, endpoint, status), count in sorted(self.requests.items(), key=str):
+                lines.append('{0}_requests_total{{{1},status="{2}"}} {3}'.format(
+                    prefix, _labels(method, endpoint), status, count))
+            for index, name, text in ((2, 'retries_total', 'Requests sent again after a 429, 5xx or connection error.'),
+                                      (3, 'response_bytes_total', 'Response body bytes received.'),
+                                      (5, 'wait_seconds_total', 'Seconds spent waiting on the rate limiter and retry backoff.')):
+                metric(name, 'counter', text)
+                for key, totals in sorted(self.endpoints.items()):
+                    lines.append('{0}_{1}{{{2}}} {3}'.format(prefix, name, _labels(*key), totals[index]))
+            metric('request_duration_seconds', 'histogram', 'Request latency including retries and waits.')
+            for key, counts in sorted(self.histograms.items()):
+                labels = _labels(*key)
+                seen = 0
+                for bound, count in zip(self.buckets + ('+Inf',), counts):
+                    seen += count
+                    lines.append('{0}_request_duration_seconds_bucket{{{1},le="{2}"}} {3}'.format(prefix, labels, bound, seen))
+                lines.append('{0}_request_duration_seconds_sum{{{1}}} {2}'.format(prefix, labels, self.endpoints[key][4]))
+                lines.append('{0}_request_duration_seconds_count{{{1}}} {2}'.format(prefix, labels, seen))
+            if(self.remaining!=None):
+                metric('rate_limit_remaining', 'gauge', 'X-RateLimit-Remaining of the latest response.')
+                lines.append('{0}_rate_limit_remaining {1}'.format(prefix, self.remaining))
+        return '\n'.join(lines) + '\n'
+
+
+    # Writes prometheus() atomically, e.g. for the node_exporter textfile collector
+    # arg: file path
+    # optional arg: metric name prefix
+    def write(self, path, prefix='freshpy'):
+        temp = path + '.tmp'
+        with open(temp, 'w') as f:
+            f.write(self.prometheus(prefix))
+        os.replace(temp, path)
+
+
+# arg: HTTP method; endpoint template
+# return: Prometheus label string
+def _labels(method, endpoint):
+    endpoint = endpoint.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return 'method="{0}",endpoint="{1}"'.format(method, endpoint)
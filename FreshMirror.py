@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+
+# Local SQLite mirror of a FreshService instance
+# Each record is stored as json next to a few indexed columns so scripts can
+# query tickets, requesters, agents, assets and reference data locally.
+# Tickets sync incrementally with updated_since from the last high-water mark,
+# requesters and assets with an updated_at query filter. A filter cannot see
+# deletions, so those two are still listed in full every full_sync_days and
+# rows missing from the listing are dropped. Agents have no filter and are
+# always listed in full. Either way records are diffed on updated_at and only
+# changed rows are written.
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from FreshPy import Field
+
+# table: (FreshPy iterator, indexed columns,
+#         incremental pull: 'updated_since', 'query'(updated_at filter) or None)
+RESOURCES = {
+    'tickets': ('iter_tickets', ('status', 'priority', 'requester_id', 'responder_id',
+                                 'group_id', 'department_id', 'created_at'), 'updated_since'),
+    'requesters': ('iter_requesters', ('primary_email', 'first_name', 'last_name', 'active'), 'query'),
+    'agents': ('iter_agents', ('email', 'first_name', 'last_name', 'active'), None),
+    'assets': ('iter_assets', ('display_id', 'name', 'asset_type_id', 'user_id', 'department_id'), 'query'),
+}
+
+# first updated_since for incremental tables; without it tickets only go back 30 days
+EPOCH = '1970-01-01T00:00:00Z'
+
+# table: FreshPy list method; small collections that are replaced on every sync
+REFERENCE = {
+    'asset_types': 'list_asset_types',
+    'departments': 'all_departments',
+    'groups': 'all_agent_groups',
+    'roles': 'all_roles',
+    'products': 'all_products',
+    'vendors': 'all_vendors',
+}
+
+
+class FreshMirror():
+    """
+        Takes a FreshPy instance and the path of the SQLite file to keep the mirror in
+        Optional: include asset type_fields, workers for concurrent page fetches,
+        days between full listings of requesters and assets(which catch deletions)
+    """
+    # args: FreshPy instance; database path
+    # optional args: type_fields(boolean) for assets; workers(integer); full_sync_days(number)
+    def __init__(self, fs, path='freshservice.db', type_fields=True, workers=None, full_sync_days=7):
+        self.fs = fs
+        self.type_fields = type_fields
+        self.workers = workers
+        self.full_sync_days = full_sync_days
+        self.db = sqlite3.connect(path)
+        self._create()
+
+
+    def close(self):
+        self.db.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    #------------------- Schema -------------------#
+    # return: {table: indexed columns} for every mirrored table
+    def _tables(self):
+        tables = {name: spec[1] for name, spec in RESOURCES.items()}
+        tables.update({name: ('name',) for name in REFERENCE})
+        return tables
+
+
+    def _create(self):
+        with self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS sync_state '
+                            '(resource TEXT PRIMARY KEY, high_water TEXT, synced_at TEXT, full_at TEXT)')
+            # mirrors created before full listings were tracked
+            if('full_at' not in [row[1] for row in self.db.execute('PRAGMA table_info(sync_state)')]):
+                self.db.execute('ALTER TABLE sync_state ADD COLUMN full_at TEXT')
+            for table, columns in self._tables().items():
+                extra = ''.join(', {} '.format(column) for column in columns)
+                self.db.execute('CREATE TABLE IF NOT EXISTS {0} '
+                                '(id INTEGER PRIMARY KEY, updated_at TEXT{1}, data TEXT)'.format(table, extra))
+                for column in columns + ('updated_at',):
+                    self.db.execute('CREATE INDEX IF NOT EXISTS {0}_{1} ON {0} ({1})'.format(table, column))
+
+
+    #------------------- Sync -------------------#
+    # optional args: list of table names(defaults to everything);
+    #                full(boolean) to list requesters and assets in full now
+    # return: {table: {'inserted', 'updated', 'deleted', 'unchanged'} counts}
+    def sync(self, resources=None, full=False):
+        if(resources==None): resources = list(RESOURCES) + list(REFERENCE)
+        stats = {}
+        for name in resources:
+            if(name in REFERENCE): stats[name] = self._sync_reference(name)
+            else: stats[name] = self._sync_resource(name, full)
+        return stats
+
+
+    # arg: table name; full(boolean) to list every record regardless of the last full listing
+    # return: counts
+    def _sync_resource(self, name, full=False):
+        method, columns, incremental = RESOURCES[name]
+        stats = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+        known = dict(self.db.execute('SELECT id, updated_at FROM {}'.format(name)))
+        high_water = self.high_water(name)
+        if(incremental=='updated_since'):
+            since = high_water if high_water!=None else EPOCH
+            records = getattr(self.fs, method)(workers=self.workers, updated_since=since)
+            seen = None
+            full = False
+        elif(incremental=='query' and high_water!=None and not full and not self._full_due(name)):
+            # the filter compares by day, so the high-water day comes back and is skipped as unchanged
+            records = self._iter_all(name, method, Field('updated_at') >= high_water[:10])
+            seen = None
+        else:
+            records = self._iter_all(name, method)
+            seen = set()
+            full = True
+        with self.db:
+            batch = []
+            for record in records:
+                if(seen!=None): seen.add(record['id'])
+                updated_at = record.get('updated_at')
+                if(updated_at!=None and (high_water==None or updated_at > high_water)):
+                    high_water = updated_at
+                previous = known.get(record['id'], False)
+                if(previous==updated_at):
+                    stats['unchanged'] += 1
+                    continue
+                stats['inserted' if previous is False else 'updated'] += 1
+                batch.append(self._row(record, columns))
+                if(len(batch) >= 500):
+                    self._upsert(name, columns, batch)
+                    batch = []
+            self._upsert(name, columns, batch)
+            if(seen!=None):
+                gone = [(record_id,) for record_id in known if record_id not in seen]
+                self.db.executemany('DELETE FROM {} WHERE id=?'.format(name), gone)
+                stats['deleted'] = len(gone)
+            self._mark(name, high_water, full)
+        return stats
+
+
+    # arg: table name; FreshPy iterator name
+    # optional arg: query(Filter) to only list matching records
+    # return: generator of every(matching) record
+    def _iter_all(self, name, method, query=None):
+        kwargs = {'workers': self.workers}
+        if(query!=None): kwargs['query'] = query
+        if(name=='assets'): kwargs['type_fields'] = self.type_fields
+        return getattr(self.fs, method)(**kwargs)
+
+
+    # arg: table name
+    # return: True if the table has not been listed in full for full_sync_days
+    def _full_due(self, name):
+        row = self.db.execute('SELECT full_at FROM sync_state WHERE resource=?', (name,)).fetchone()
+        if(row==None or row[0]==None): return True
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.full_sync_days)
+        return row[0] <= cutoff.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+    # arg: table name
+    # return: counts
+    def _sync_reference(self, name):
+        records = getattr(self.fs, REFERENCE[name])()
+        with self.db:
+            self.db.execute('DELETE FROM {}'.format(name))
+            self._upsert(name, ('name',), [self._row(record, ('name',)) for record in records])
+            self._mark(name, None, True)
+        return {'inserted': len(records), 'updated': 0, 'deleted': 0, 'unchanged': 0}
+
+
+    # arg: record json; indexed columns
+    # return: row tuple in table column order
+    def _row(self, record, columns):
+        values = [record.get(column) for column in columns]
+        values = [json.dumps(v) if isinstance(v, (dict, list)) else v for v in values]
+        return tuple([record['id'], record.get('updated_at')] + values + [json.dumps(record)])
+
+
+    # arg: table name; indexed columns; list of row tuples
+    def _upsert(self, name, columns, rows):
+        if(not rows): return
+        marks = ', '.join('?' * (len(columns) + 3))
+        self.db.executemany('INSERT OR REPLACE INTO {0} (id, updated_at, {1}, data) VALUES ({2})'
+                            .format(name, ', '.join(columns), marks), rows)
+
+
+    # arg: table name; high-water updated_at(string or None); full(boolean) if every record was listed
+    def _mark(self, name, high_water, full):
+        synced_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        self.db.execute('INSERT INTO sync_state (resource, high_water, synced_at, full_at) VALUES (?, ?, ?, ?) '
+                        'ON CONFLICT(resource) DO UPDATE SET high_water=excluded.high_water, '
+                        'synced_at=excluded.synced_at, full_at=coalesce(excluded.full_at, full_at)',
+                        (name, high_water, synced_at, synced_at if full else None))
+
+
+    # arg: table name
+    # return: last synced updated_at(string) or None before the first sync
+    def high_water(self, name):
+        row = self.db.execute('SELECT high_water FROM sync_state WHERE resource=?', (name,)).fetchone()
+        return row[0] if row!=None else None
+
+
+    #------------------- Local Queries -------------------#
+    # arg: table name; record id
+    # return: record json or None
+    def get(self, name, record_id):
+        row = self.db.execute('SELECT data FROM {} WHERE id=?'.format(self._table(name)), (record_id,)).fetchone()
+        return json.loads(row[0]) if row!=None else None
+
+
+    # Equality lookup on indexed columns, e.g. find('assets', asset_type_id=17000254)
+    # arg: table name; column=value keyword args
+    # return: list of record jsons
+    def find(self, name, **where):
+        columns = self._tables()[self._table(name)] + ('id', 'updated_at')
+        for column in where:
+            if(column not in columns): raise ValueError("{0} is not an indexed column of {1}".format(column, name))
+        clause = ' AND '.join('{}=?'.format(column) for column in where) or '1'
+        return self.query(name, clause, tuple(where.values()))
+
+
+    # arg: table name; SQL WHERE clause; parameters
+    # return: list of record jsons
+    def query(self, name, where='1', params=()):
+        sql = 'SELECT data FROM {0} WHERE {1}'.format(self._table(name), where)
+        return [json.loads(row[0]) for row in self.db.execute(sql, params)]
+
+
+    # arg: table name
+    # return: table name, raises ValueError if it isn't mirrored
+    def _table(self, name):
+        if(name not in self._tables()): raise ValueError("Unknown table: {}".format(name))
+        return name
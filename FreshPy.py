@@ -3,67 +3,1217 @@
 # Author: Blastomussa
 # Date 12/13/2021
 # Class based implementation of FreshService API
+import codecs
+import contextvars
+import json
+import os
+import random
+import sqlite3
 import requests
-from sys import exit
-from time import sleep
-
-# Add limiting to stay under api rate: https://support.freshservice.com/support/solutions/articles/50000000293-what-is-the-rate-limit-for-apis-across-all-plans-
-# Add better error handling; maybe switch statement for status codes on exit()
+from requests.adapters import HTTPAdapter
+from collections import deque, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, quote
+from contextlib import contextmanager
+from threading import BoundedSemaphore, Event, Lock, Thread
+# time() is aliased so `from FreshPy import *` doesn't shadow a script's `import time`
+from time import sleep, monotonic, time as _time
+
+# use a faster json decoder when one is installed
+try:
+    from orjson import loads as json_loads
+except(ImportError):
+    from json import loads as json_loads
+
+# lane set by FreshPy.lane() for the requests made inside the block
+_LANE = contextvars.ContextVar('freshpy_lane', default=None)
+
+# last_login_by type field on the author's domain; differs per freshservice instance
+LAST_LOGIN_FIELD = 'last_login_by_17000000908'
+
+# API rate limits: https://support.freshservice.com/support/solutions/articles/50000000293-what-is-the-rate-limit-for-apis-across-all-plans-
 # Add intuituve pagination handling
 # Error handling for bad uri's, dead connection, failed auth, api rate, bad jsons
 
+class FreshPyError(Exception):
+    """
+        Raised when FreshService answers with an unexpected status code.
+        Keeps the status code and response object for the caller
+    """
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.response = response
+        super().__init__(str(response.status_code) + " Error")
+
+
+class BulkReport():
+    """
+        Per-item outcome of a bulk call: succeeded is a list of (item, result json)
+        and failed a list of (item, exception), both in input order. skipped
+        lists the items apply_* left alone because the record already matched
+    """
+    def __init__(self):
+        self.succeeded = []
+        self.failed = []
+        self.skipped = []
+
+
+    def __len__(self):
+        return len(self.succeeded) + len(self.failed)
+
+
+    def __repr__(self):
+        return "BulkReport(succeeded={0}, failed={1}, skipped={2})".format(
+            len(self.succeeded), len(self.failed), len(self.skipped))
+
+
+    # return: True if every item succeeded
+    @property
+    def ok(self):
+        return len(self.failed)==0
+
+
+class RateLimiter():
+    """
+        Per-minute request budget kept in step with FreshService's
+        X-RateLimit-* headers. The budget comes back whole when the minute
+        window resets, so calls run at full speed while it lasts, queue for
+        the next window once it is spent and slow down within margin
+        requests of the end: the last ones are spread over the rest of the
+        window so the server's count is read back before it runs out
+    """
+    # time source; SharedRateLimiter needs one that agrees across processes
+    clock = staticmethod(monotonic)
+    # share of the budget held back when no margin is given
+    MARGIN = 0.05
+    # seconds the budget lasts; FreshService counts requests per minute
+    WINDOW = 60.0
+
+    # optional args: per_minute(budget to assume before first response);
+    #                margin(tokens held back, MARGIN of the budget if None)
+    def __init__(self, per_minute=None, margin=None):
+        self.lock = Lock()
+        self.margin = margin
+        self.capacity = None
+        self.tokens = None
+        self.window_start = None
+        self.reset_at = None
+        self.blocked_until = 0.0
+        if(per_minute!=None): self._resize(per_minute)
+
+
+    # The first time the budget is known, whatever was sent before is charged to it
+    # arg: per minute request budget(integer)
+    def _resize(self, per_minute):
+        if(self.capacity==None): self.tokens = per_minute + (self.tokens or 0.0)
+        self.capacity = per_minute
+
+
+    # return: tokens held back
+    def _margin(self):
+        if(self.margin!=None): return self.margin
+        return max(1.0, self.capacity * self.MARGIN)
+
+
+    # Starts a new window once the current one has ended. The server starts
+    # its window at the first request after the last one expired, so the new
+    # one is taken to start now; requests queued for it(negative tokens) are
+    # charged to it, and after a whole idle window nothing is queued any more
+    # arg: current clock time
+    def _refill(self, now):
+        if(self.capacity==None): return
+        if(self.reset_at!=None and now < self.reset_at): return
+        if(self.reset_at!=None):
+            if(now >= self.reset_at + self.WINDOW): self.tokens = float(self.capacity)
+            else: self.tokens = min(self.capacity, self.tokens + self.capacity)
+        self.window_start, self.reset_at = now, now + self.WINDOW
+
+
+    # Lets requests through while the budget is unknown(before the first
+    # response) but counts them, and starts the window with the first one
+    # arg: current clock time; request cost(integer); seconds to wait
+    # return: seconds to wait(float)
+    def _unmetered(self, now, cost, wait):
+        if(self.reset_at==None): self.window_start, self.reset_at = now, now + self.WINDOW
+        self.tokens = (self.tokens or 0.0) - cost
+        return wait
+
+
+    # Takes tokens now and returns how long the caller must wait before sending.
+    # Tokens may go negative: those callers are queued for the next window
+    # arg: request cost(integer)
+    # return: seconds to wait(float)
+    def reserve(self, cost=1):
+        with self.lock:
+            now = self.clock()
+            self._refill(now)
+            wait = max(0.0, self.blocked_until - now)
+            if(self.capacity==None): return self._unmetered(now, cost, wait)
+            self.tokens -= cost
+            margin = self._margin()
+            if(self.tokens >= margin): return wait
+            if(self.tokens >= 0):
+                # the k-th of the last margin tokens goes k/(margin+1) of the way to the reset
+                return max(wait, (self.reset_at - now) * (margin - self.tokens) / (margin + 1))
+            ahead = int(-self.tokens // self.capacity)  # whole windows after the next one
+            return max(wait, self.reset_at - now + ahead * self.WINDOW)
+
+
+    # Takes tokens only if (1 - share) of the budget is still left afterwards,
+    # so a lower lane never queues ahead of calls with the full budget
+    # arg: request cost(integer); share(0-1) of the budget the caller may use
+    # return: 0.0 once taken, else seconds to wait before polling again
+    def poll(self, cost=1, share=1.0):
+        with self.lock:
+            now = self.clock()
+            self._refill(now)
+            wait = self.blocked_until - now
+            if(wait > 0): return wait
+            if(self.capacity==None): return self._unmetered(now, cost, 0.0)
+            floor = self._margin() + (1.0 - share) * self.capacity
+            if(self.tokens - cost >= floor):
+                self.tokens -= cost
+                return 0.0
+            return self.reset_at - now
+
+
+    # blocks until a request may be sent
+    # arg: request cost(integer)
+    # optional arg: share(0-1) of the budget the caller may use, see poll
+    # return: seconds waited(float)
+    def acquire(self, cost=1, share=1.0):
+        if(share >= 1):
+            wait = self.reserve(cost)
+            if(wait > 0): sleep(wait)
+            return wait
+        waited = 0.0
+        while(True):
+            wait = self.poll(cost, share)
+            if(wait<=0): return waited
+            sleep(wait)
+            waited += wait
+
+
+    # Syncs the budget with the one reported by the server. X-RateLimit-Remaining
+    # of a request sent before the current window started belongs to the
+    # previous window and is ignored
+    # arg: response headers(dict-like)
+    # optional arg: clock time the request was sent
+    def update(self, headers, sent=None):
+        total = headers.get('X-RateLimit-Total')
+        remaining = headers.get('X-RateLimit-Remaining')
+        used = headers.get('X-RateLimit-Used-CurrentRequest')
+        with self.lock:
+            if(total!=None and int(total)!=self.capacity): self._resize(int(total))
+            self._refill(self.clock())
+            if(self.capacity==None): return
+            if(used!=None): self.tokens -= max(0, int(used) - 1)
+            if(remaining!=None and (sent==None or sent >= self.window_start)):
+                self.tokens = min(self.tokens, float(remaining))
+
+
+    # Stops all callers until the server's Retry-After window has passed,
+    # which is also when its budget comes back
+    # arg: seconds(float)
+    def retry_after(self, seconds):
+        with self.lock:
+            now = self.clock()
+            self._refill(now)
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            if(self.capacity!=None):
+                self.tokens = min(self.tokens, 0.0)
+                self.reset_at = now + seconds
+                self.window_start = self.reset_at - self.WINDOW
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+        RateLimiter whose budget lives in a SQLite file, so every process on
+        the host using the same path(cron jobs, services) draws from one
+        budget and agrees on when its window resets. The budget is seeded and
+        corrected from the X-RateLimit-* headers any of them receives, and a
+        429 seen by one process holds back all of them until Retry-After has passed
+    """
+    clock = staticmethod(_time)
+
+    # arg: SQLite file path
+    # optional args: per_minute(budget to assume before first response);
+    #                margin(tokens held back, MARGIN of the budget if None)
+    def __init__(self, path, per_minute=None, margin=None):
+        super().__init__(None, margin)
+        self.path = path
+        self.file_lock = Lock()
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        with self.file_lock:
+            self.db.execute('CREATE TABLE IF NOT EXISTS budget (id INTEGER PRIMARY KEY CHECK (id=0), '
+                            'capacity REAL, tokens REAL, window_start REAL, reset_at REAL, blocked_until REAL)')
+            self.db.execute('INSERT OR IGNORE INTO budget VALUES (0, NULL, NULL, NULL, NULL, 0)')
+        if(per_minute!=None):
+            with self._shared():
+                if(self.capacity==None): self._resize(per_minute)
+
+
+    # Loads the budget under an exclusive SQLite transaction and writes it back afterwards
+    @contextmanager
+    def _shared(self):
+        with self.file_lock:
+            self.db.execute('BEGIN IMMEDIATE')
+            try:
+                (self.capacity, self.tokens, self.window_start, self.reset_at, self.blocked_until) = self.db.execute(
+                    'SELECT capacity, tokens, window_start, reset_at, blocked_until FROM budget WHERE id=0').fetchone()
+                if(self.capacity!=None): self.capacity = int(self.capacity)
+                yield
+                self.db.execute('UPDATE budget SET capacity=?, tokens=?, window_start=?, reset_at=?, blocked_until=? WHERE id=0',
+                                (self.capacity, self.tokens, self.window_start, self.reset_at, self.blocked_until))
+                self.db.execute('COMMIT')
+            except(BaseException):
+                self.db.execute('ROLLBACK')
+                raise
+
+
+    def reserve(self, cost=1):
+        with self._shared():
+            return super().reserve(cost)
+
+
+    def poll(self, cost=1, share=1.0):
+        with self._shared():
+            return super().poll(cost, share)
+
+
+    def update(self, headers, sent=None):
+        with self._shared():
+            super().update(headers, sent)
+
+
+    def retry_after(self, seconds):
+        with self._shared():
+            super().retry_after(seconds)
+
+
+    def close(self):
+        self.db.close()
+
+
+# lane: (max requests in flight or None, share of the rate budget it may use)
+LANES = {
+    'interactive': (None, 1.0),
+    'bulk': (None, 0.8),
+}
+
+
+class Scheduler():
+    """
+        Priority lanes over a RateLimiter. Each lane may cap its requests in
+        flight and only spend its share of the rate budget; the rest is kept
+        for higher lanes. With the default LANES bulk requests stop while
+        less than a fifth of the budget is left, which interactive calls then
+        have to themselves. Share one Scheduler between the FreshPy instances
+        that use the same API key
+    """
+    # arg: RateLimiter
+    # optional arg: {lane: (max in flight or None, budget share)}(defaults to LANES)
+    def __init__(self, limiter, lanes=None):
+        self.limiter = limiter
+        self.lanes = dict(lanes if lanes!=None else LANES)
+        self.gates = {name: BoundedSemaphore(concurrency)
+                      for name, (concurrency, share) in self.lanes.items() if concurrency!=None}
+
+
+    # arg: lane name
+    # return: (max in flight or None, budget share)
+    def lane(self, name):
+        if(name not in self.lanes): raise ValueError("Unknown lane: {}".format(name))
+        return self.lanes[name]
+
+
+    # blocks until the lane has a free slot; pair with leave()
+    # arg: lane name
+    def enter(self, name):
+        self.lane(name)
+        if(name in self.gates): self.gates[name].acquire()
+
+
+    def leave(self, name):
+        if(name in self.gates): self.gates[name].release()
+
+
+    # blocks until the lane may send a request
+    # arg: lane name
+    # return: seconds waited(float)
+    def acquire(self, name):
+        return self.limiter.acquire(share=self.lane(name)[1])
+
+
+class ResponseCache():
+    """
+        Bounded LRU of GET responses for single-record endpoints. Entries are
+        served without a request for ttl seconds, then revalidated with their
+        ETag/Last-Modified validators so an unchanged record costs a 304
+    """
+    # optional args: maxsize(entries); ttl(seconds an entry is served without revalidating)
+    def __init__(self, maxsize=512, ttl=30):
+        self.lock = Lock()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+
+
+    # List pages(including filtered ones) are left out, they would churn the
+    # cache and go stale together
+    # arg: API URI
+    # return: True if the GET response for uri may be cached
+    def cacheable(self, uri):
+        query = dict(parse_qsl(urlsplit(uri).query))
+        return not any(name in query for name in ('page', 'per_page', 'query', 'filter'))
+
+
+    # arg: API URI
+    # return: (cached response if still fresh else None, conditional request headers)
+    def lookup(self, uri):
+        with self.lock:
+            entry = self.entries.get(uri)
+            if(entry==None): return None, {}
+            self.entries.move_to_end(uri)
+            response, stored = entry
+        if(monotonic() - stored < self.ttl): return response, {}
+        headers = {}
+        if('ETag' in response.headers): headers['If-None-Match'] = response.headers['ETag']
+        if('Last-Modified' in response.headers): headers['If-Modified-Since'] = response.headers['Last-Modified']
+        return None, headers
+
+
+    # Stores a 200 or, on a 304, restarts the ttl of the cached response
+    # arg: API URI; response object
+    # return: response object to hand to the caller
+    def store(self, uri, response):
+        with self.lock:
+            if(response.status_code==304):
+                entry = self.entries.get(uri)
+                if(entry==None): return response
+                response = entry[0]
+            self.entries[uri] = (response, monotonic())
+            self.entries.move_to_end(uri)
+            while(len(self.entries) > self.maxsize):
+                self.entries.popitem(last=False)
+        return response
+
+
+    # Drops every entry for the record a write went to, e.g. a PUT to
+    # /assets/5 or /requesters/5/reactivate drops /assets/5?include=type_fields
+    # and /requesters/5. Lookups by email expire through the ttl
+    # arg: API URI that was written to
+    def invalidate(self, uri):
+        path = urlsplit(uri).path
+        with self.lock:
+            for key in list(self.entries):
+                cached = urlsplit(key).path
+                if(cached==path or path.startswith(cached + '/')):
+                    del self.entries[key]
+
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class SingleFlight():
+    """
+        Lets concurrent identical calls share one execution: the first caller
+        runs it and callers arriving while it is in flight get its result(or
+        exception) instead of running it again. Nothing is kept afterwards
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self.calls = {}
+
+
+    # arg: hashable key for the call; function to run
+    # return: result of func, shared by every caller with the same key
+    def do(self, key, func):
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future==None
+            if(leader): future = self.calls[key] = Future()
+        if(not leader): return future.result()
+        try:
+            future.set_result(func())
+        except(BaseException) as e:
+            future.set_exception(e)
+        finally:
+            with self.lock:
+                del self.calls[key]
+        return future.result()
+
+
+class RetryPolicy():
+    """
+        Exponential backoff with full jitter for 429s, 5xx and connection errors.
+        Retry-After is honoured when the server sends it; POSTs are only
+        retried on 429 since anything else may already have created the record
+    """
+    # optional args: retries(integer); backoff(seconds for the first retry); max_backoff(seconds)
+    #                statuses(retryable status codes); idempotent(methods safe to resend)
+    def __init__(self, retries=5, backoff=0.5, max_backoff=60, statuses=(429,500,502,503,504),
+                 idempotent=('GET','PUT','DELETE')):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = statuses
+        self.idempotent = idempotent
+
+
+    # arg: HTTP method; response object or None; connection error or None
+    # return: True if the request may be sent again
+    def retryable(self, method, response=None, error=None):
+        if(response!=None and response.status_code==429): return True
+        if(method not in self.idempotent): return False
+        if(error!=None): return True
+        return response!=None and response.status_code in self.statuses
+
+
+    # arg: attempt number(0 for the first retry); response object or None
+    # return: seconds to wait
+    def delay(self, attempt, response=None):
+        if(response!=None and 'Retry-After' in response.headers):
+            try:
+                return float(response.headers['Retry-After'])
+            except(ValueError):
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+
+class Checkpoint():
+    """
+        Append-only file of completed pages so a crashed pull resumes where it
+        stopped. Each line holds one page's records and the next page URI.
+        The file is removed once the last page has been consumed
+    """
+    # arg: checkpoint file path
+    def __init__(self, path):
+        self.path = path
+
+
+    # Replays the saved pages; a partly written last line is ignored
+    # return: generator of (records, next page URI) in saved order
+    def pages(self):
+        if(not os.path.exists(self.path)): return
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    page = json.loads(line)
+                except(ValueError):
+                    return
+                yield page['records'], page['next']
+
+
+    # arg: list of records; next page URI(None once the last page is saved)
+    def save(self, records, next_page):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps({'next': next_page, 'records': records}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+    def clear(self):
+        if(os.path.exists(self.path)): os.remove(self.path)
+
+
+# Decodes the array under a top-level key one record at a time, so a page is
+# never held as a whole body plus a whole object tree
+# arg: iterable of body byte chunks; json key holding the records
+# return: generator of record jsons
+def iter_json_array(chunks, key):
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buf, pos, found = '', 0, False
+    while(True):
+        if(not found):
+            start = buf.find('"' + key + '"')
+            bracket = buf.find('[', start) if(start!=-1) else -1
+            if(bracket!=-1):
+                found, pos = True, bracket + 1
+                continue
+        else:
+            while(pos < len(buf) and buf[pos] in ' \t\r\n,'): pos += 1
+            if(pos < len(buf) and buf[pos]==']'): return
+            if(pos < len(buf)):
+                try:
+                    record, end = decoder.raw_decode(buf, pos)
+                except(ValueError):
+                    record = None  # incomplete, read more
+                if(record!=None):
+                    yield record
+                    pos = end
+                    continue
+        chunk = next(chunks, None)
+        if(chunk==None): raise ValueError("Truncated json array: {}".format(key))
+        buf, pos = buf[pos:] + text.decode(chunk), 0
+
+
+# Keeps only the requested keys of each record; dotted names reach into
+# nested objects, e.g. 'type_fields.last_login_by_17000000908'
+# arg: list of records; list of field names
+# return: list of projected records
+def project(records, fields):
+    tree = {}
+    for field in fields:
+        node = tree
+        for part in field.split('.'):
+            node = node.setdefault(part, {})
+    return [_project(record, tree) for record in records]
+
+
+def _project(record, tree):
+    out = {}
+    for name, sub in tree.items():
+        if(name not in record): continue
+        value = record[name]
+        out[name] = _project(value, sub) if(sub and isinstance(value, dict)) else value
+    return out
+
+
+class Filter():
+    """
+        Server-side filter in FreshService's query language, built from Field
+        comparisons joined with & and |:
+        (Field('status')==2) & (Field('priority')>=3)  ->  status:2 AND priority:>3
+        Pass it as query= to iter_tickets, iter_requesters or iter_assets
+    """
+    # arg: compiled query text
+    # optional arg: 'AND'/'OR' if text joins several conditions
+    def __init__(self, text, op=None):
+        self.text = text
+        self.op = op
+
+
+    def __and__(self, other):
+        return self._join('AND', other)
+
+
+    def __or__(self, other):
+        return self._join('OR', other)
+
+
+    # arg: 'AND' or 'OR'; Filter
+    # return: Filter, with mixed AND/OR groups parenthesized
+    def _join(self, op, other):
+        parts = [f.text if f.op in (None, op) else '(' + f.text + ')' for f in (self, other)]
+        return Filter(parts[0] + ' ' + op + ' ' + parts[1], op)
+
+
+    def __str__(self):
+        return self.text
+
+
+    def __repr__(self):
+        return "Filter({!r})".format(self.text)
+
+
+class Field():
+    """
+        Filterable field for building a Filter. FreshService only has equality
+        and inclusive range conditions, so >= and <= compile to :> and :<
+        and strict < and > raise TypeError; dates are compared by day
+    """
+    def __init__(self, name):
+        self.name = name
+
+
+    def __eq__(self, value):
+        return Filter('{0}:{1}'.format(self.name, _literal(value)))
+
+
+    def __ge__(self, value):
+        return Filter('{0}:>{1}'.format(self.name, _literal(value)))
+
+
+    def __le__(self, value):
+        return Filter('{0}:<{1}'.format(self.name, _literal(value)))
+
+
+    def __gt__(self, value):
+        raise TypeError("FreshService filters are inclusive, use >= instead of >")
+
+
+    def __lt__(self, value):
+        raise TypeError("FreshService filters are inclusive, use <= instead of <")
+
+
+    # arg: iterable of values
+    # return: Filter matching any of them
+    def isin(self, values):
+        filters = [self==value for value in values]
+        if(not filters): raise ValueError("isin() needs at least one value")
+        result = filters[0]
+        for f in filters[1:]:
+            result = result | f
+        return result
+
+
+# Equality filter from keyword args; list/tuple/set values match any member
+#   where(asset_type_id=17000025, department_id=[1, 2])
+# return: Filter
+def where(**fields):
+    result = None
+    for name, value in fields.items():
+        f = Field(name).isin(value) if isinstance(value, (list, tuple, set)) else Field(name)==value
+        result = f if(result==None) else result & f
+    if(result==None): raise ValueError("where() needs at least one field")
+    return result
+
+
+# arg: python value
+# return: FreshService query literal
+def _literal(value):
+    if(value is None): return 'null'
+    if(isinstance(value, bool)): return 'true' if value else 'false'
+    if(isinstance(value, (int, float))): return str(value)
+    if(hasattr(value, 'isoformat')): value = value.isoformat()[:10]  # date or datetime
+    return "'" + str(value).replace("'", "\\'") + "'"
+
+
+# Collapses record ids so calls group per endpoint, e.g.
+# https://x.freshservice.com/api/v2/assets/17/requests?page=2 -> /assets/{id}/requests
+# arg: API URI
+# return: endpoint template(string)
+def endpoint_template(uri):
+    path = urlsplit(uri).path
+    if('/api/v2' in path): path = path.split('/api/v2', 1)[1]
+    return '/'.join('{id}' if part.isdigit() else part for part in path.split('/'))
+
+
+# catalog section(also the API path it lives under): FreshPy list method
+CATALOG = {
+    'asset_types': 'list_asset_types',
+    'roles': 'all_roles',
+    'departments': 'all_departments',
+    'groups': 'all_agent_groups',
+    'agent_fields': 'agent_fields',
+    'requester_fields': 'requester_fields',
+}
+
+
+class Catalog():
+    """
+        Memoized reference data with name->id and id->name lookups.
+        Sections load together on first use, expire after ttl seconds and are
+        dropped whenever FreshPy writes to the matching endpoint
+    """
+    # arg: FreshPy instance
+    # optional arg: ttl(seconds)
+    def __init__(self, fs, ttl=3600):
+        self.fs = fs
+        self.ttl = ttl
+        self.lock = Lock()
+        self.sections = {}
+
+
+    # Fetches every missing or expired section concurrently
+    # optional arg: list of section names(defaults to all of CATALOG)
+    def load(self, names=None):
+        names = self._stale(names)
+        if(not names): return
+        with ThreadPoolExecutor(max_workers=len(names)) as pool:
+            futures = [self.fs._submit(pool, getattr(self.fs, CATALOG[name])) for name in names]
+            results = [future.result() for future in futures]
+        for name, records in zip(names, results):
+            self._store(name, records)
+
+
+    # arg: list of section names or None
+    # return: names that need loading
+    def _stale(self, names):
+        if(names==None): names = list(CATALOG)
+        now = monotonic()
+        with self.lock:
+            return [name for name in names if name not in self.sections
+                    or now - self.sections[name][3] >= self.ttl]
+
+
+    # arg: section name; list of records
+    def _store(self, name, records):
+        by_name = {record.get('name'): record['id'] for record in records}
+        by_id = {record['id']: record.get('name') for record in records}
+        with self.lock:
+            self.sections[name] = (records, by_name, by_id, monotonic())
+
+
+    # arg: section name
+    # return: list of records
+    def get(self, name):
+        self.load([name])
+        return self.sections[name][0]
+
+
+    # arg: section name
+    # return: {name: id}
+    def ids(self, name):
+        self.load([name])
+        return self.sections[name][1]
+
+
+    # arg: section name
+    # return: {id: name}
+    def names(self, name):
+        self.load([name])
+        return self.sections[name][2]
+
+
+    # optional arg: section name(defaults to every section)
+    def expire(self, name=None):
+        with self.lock:
+            if(name==None): self.sections.clear()
+            else: self.sections.pop(name, None)
+
+
+    # arg: API URI that was written to
+    def invalidate(self, uri):
+        section = urlsplit(uri).path.split('/api/v2/')[-1].split('/')[0]
+        if(section in CATALOG): self.expire(section)
+
+
+# resource: FreshPy update method taking (id, data)
+UPDATES = {
+    'assets': 'update_asset',
+    'tickets': 'update_ticket',
+    'requesters': 'update_requester',
+}
+
+
+class WriteBuffer():
+    """
+        Opt-in write-behind buffer for FreshPy updates. Changes to the same
+        (resource, id) are merged, nested objects like type_fields key by key
+        with the latest value winning, and sent as one PUT per record when
+        max_pending records are waiting, the oldest change is max_delay seconds
+        old, or flush()/close() is called. Flushes run one at a time, so a
+        record's writes reach FreshService in the order they were made
+    """
+    # arg: FreshPy instance
+    # optional args: max_pending(records); max_delay(seconds, None for no timer); workers(integer)
+    def __init__(self, fs, max_pending=100, max_delay=5.0, workers=8):
+        self.fs = fs
+        self.max_pending = max_pending
+        self.max_delay = max_delay
+        self.workers = workers
+        self.lock = Lock()
+        self.flushing = Lock()
+        self.pending = OrderedDict()  # (resource, id): (data, monotonic time of first change)
+        self.failed = []              # ((resource, id, data), exception) from every flush
+        self.stopped = Event()
+        self.timer = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def __len__(self):
+        return len(self.pending)
+
+
+    # Queues a change; flushes in the calling thread once max_pending records wait
+    # arg: resource('assets', 'tickets' or 'requesters'); record id; json data
+    def update(self, resource, record_id, data):
+        if(resource not in UPDATES): raise ValueError("Unknown resource: {}".format(resource))
+        with self.lock:
+            key = (resource, record_id)
+            if(key in self.pending):
+                merged, since = self.pending[key]
+                self.pending[key] = (_merge(merged, data), since)
+            else:
+                self.pending[key] = (_merge({}, data), monotonic())
+            full = len(self.pending) >= self.max_pending
+            if(self.timer==None and self.max_delay!=None):
+                self.timer = Thread(target=self._run, daemon=True)
+                self.timer.start()
+        if(full): self.flush()
+
+
+    def update_asset(self, display_id, data):
+        self.update('assets', display_id, data)
+
+
+    def update_ticket(self, ticket_id, data):
+        self.update('tickets', ticket_id, data)
+
+
+    def update_requester(self, requester_id, data):
+        self.update('requesters', requester_id, data)
+
+
+    # Sends every pending record concurrently
+    # return: BulkReport of ((resource, id, data), result) items; failures are also kept in self.failed
+    def flush(self):
+        with self.flushing:
+            with self.lock:
+                items = [(resource, record_id, data) for (resource, record_id), (data, since) in self.pending.items()]
+                self.pending.clear()
+            report = self.fs._bulk(self._send, items, self.workers)
+            self.failed += report.failed
+            return report
+
+
+    # arg: resource; record id; merged json data
+    # return: updated record json
+    def _send(self, resource, record_id, data):
+        return getattr(self.fs, UPDATES[resource])(record_id, data)
+
+
+    # background timer: flushes once the oldest pending change is max_delay old
+    def _run(self):
+        while(not self.stopped.wait(self.max_delay / 4.0)):
+            with self.lock:
+                due = self.pending and monotonic() - next(iter(self.pending.values()))[1] >= self.max_delay
+            if(due): self.flush()
+
+
+    # Stops the timer and sends what is still pending
+    # return: BulkReport of the last flush
+    def close(self):
+        self.stopped.set()
+        if(self.timer!=None): self.timer.join()
+        return self.flush()
+
+
+# Merges update data into pending data; nested objects are merged key by key
+# arg: pending data(dict, changed in place); new data
+# return: pending data
+def _merge(pending, data):
+    for key, value in data.items():
+        if(isinstance(value, dict) and isinstance(pending.get(key), dict)): _merge(pending[key], value)
+        elif(isinstance(value, dict)): pending[key] = _merge({}, value)
+        else: pending[key] = value
+    return pending
+
+
+# returned by FreshPy._apply_one for a record that already matches
+_UNCHANGED = object()
+
+
+# Looks a record up by id whether the index and the id use integers or
+# strings(ids read from a CSV are strings)
+# arg: {record id: record json}; record id
+# return: record json or None
+def _lookup(index, record_id):
+    record = index.get(record_id)
+    if(record==None and isinstance(record_id, str) and record_id.isdigit()): record = index.get(int(record_id))
+    elif(record==None and isinstance(record_id, int)): record = index.get(str(record_id))
+    return record
+
+
+# Fields of desired that differ from the current record; nested objects such as
+# type_fields are compared key by key and only their changed keys are kept
+# arg: current record json; desired data
+# return: changed data(empty if the record already matches)
+def diff(current, desired):
+    changes = {}
+    for key, value in desired.items():
+        have = current.get(key)
+        if(isinstance(value, dict) and isinstance(have, dict)):
+            nested = diff(have, value)
+            if(nested): changes[key] = nested
+        elif(have!=value):
+            changes[key] = value
+    return changes
+
+
 class FreshPy():
     """
         Takes api key and custom domain of freshservice instance as arguments
+        Optional: connection pool size, request timeout, extra default headers,
+        per minute rate limit, a RateLimiter shared with other instances, a
+        RetryPolicy and a
+        ResponseCache(or True for the default one) for view_* calls.
+        Reference data is memoized on .catalog for catalog_ttl seconds.
+        decoder replaces the json loads function; stream_pages decodes list
+        pages incrementally while they download.
+        hooks is a list of functions called with an event dict after every
+        request(see _emit); FreshMetrics.RequestMetrics aggregates them.
+        coalesce shares one request between concurrent identical GETs.
+        Requests go through scheduler's priority lanes, in lane unless a
+        `with FS.lane(name):` block says otherwise
     """
     # args: FreshService API Key and FreshService domain URL
-    def __init__(self, api_key, root_uri):
+    # optional args: pool_size(max kept-alive connections), timeout(seconds), headers(dict)
+    #                rate_limit(requests per minute, read from headers if None), limiter(RateLimiter)
+    #                retry(RetryPolicy); cache(ResponseCache or True); catalog_ttl(seconds)
+    #                decoder(function bytes -> json); stream_pages(boolean)
+    #                hooks(list of functions taking a request event dict); coalesce(boolean)
+    #                scheduler(Scheduler, shares its limiter); lane(default lane name)
+    def __init__(self, api_key, root_uri, pool_size=10, timeout=None, headers=None,
+                 rate_limit=None, limiter=None, retry=None, cache=None, catalog_ttl=3600,
+                 decoder=None, stream_pages=False, hooks=None, coalesce=True,
+                 scheduler=None, lane='interactive'):
         self.key = api_key
         self.root_uri = root_uri + '/api/v2'
+        self.timeout = timeout
+        self.session = self._session(pool_size, headers)
+        if(scheduler!=None and limiter!=None and scheduler.limiter is not limiter):
+            raise ValueError("limiter must be the scheduler's limiter; build the Scheduler around it instead")
+        if(limiter==None): limiter = scheduler.limiter if scheduler!=None else RateLimiter(rate_limit)
+        self.limiter = limiter
+        self.scheduler = scheduler if scheduler!=None else Scheduler(limiter)
+        self.scheduler.lane(lane)
+        self.default_lane = lane
+        self.retry = retry if retry!=None else RetryPolicy()
+        self.cache = ResponseCache() if cache==True else cache
+        self.catalog = Catalog(self, catalog_ttl)
+        self.loads = decoder if decoder!=None else json_loads
+        self.stream_pages = stream_pages
+        self.hooks = list(hooks) if hooks!=None else []
+        self.flights = SingleFlight() if coalesce else None
+
+
+    # Every call goes through one pooled session so TCP/TLS connections to the
+    # FreshService host are reused instead of re-negotiated per request
+    # args: pool size(integer); extra default headers(dict or None)
+    # return: requests.Session object
+    def _session(self, pool_size, headers):
+        session = requests.Session()
+        session.auth = (self.key,'')
+        session.headers.update({
+            'Accept':'application/json',
+            'Connection':'keep-alive'
+        })
+        if(headers!=None): session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+
+    # closes pooled connections; instance can also be used as a context manager
+    def close(self):
+        self.session.close()
+
+
+    # Runs the requests made inside the block in another scheduler lane, e.g.
+    #   with FS.lane('bulk'): FS.list_assets()
+    # Worker threads started by pagination and bulk calls inherit it
+    # arg: lane name
+    @contextmanager
+    def lane(self, name):
+        self.scheduler.lane(name)
+        token = _LANE.set(name)
+        try:
+            yield self
+        finally:
+            _LANE.reset(token)
+
+
+    # return: lane of the current call
+    def _lane(self):
+        lane = _LANE.get()
+        return lane if lane!=None else self.default_lane
+
+
+    # Submits func to a thread pool with the caller's lane
+    # arg: ThreadPoolExecutor; function; arguments and keyword arguments
+    # return: Future
+    def _submit(self, pool, func, *args, **kwargs):
+        return pool.submit(contextvars.copy_context().run, func, *args, **kwargs)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
 
 
     #------------------- Raw API Requests -------------------#
+    # Waits for a slot in the call's scheduler lane and on the rate limiter
+    # before sending, and feeds the limiter the rate limit headers afterwards;
+    # failures are retried according to self.retry
+    # arg: HTTP method; API URI; accepted status codes; extra requests kwargs
+    # return: requests.response object
+    def _request(self, method, uri, ok=(200,), **kwargs):
+        attempt = 0
+        started = monotonic()
+        waited = 0.0
+        lane = self._lane()
+        self.scheduler.enter(lane)
+        try:
+            while(True):
+                waited += self.scheduler.acquire(lane)
+                response, error = None, None
+                try:
+                    response = self.session.request(method, uri, timeout=self.timeout, **kwargs)
+                except(requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+                wait = self._retry_wait(method, response, error, attempt)
+                if(wait==None): break
+                if(response!=None): response.close()
+                sleep(wait)
+                waited += wait
+                attempt += 1
+        finally:
+            self.scheduler.leave(lane)
+        self._emit(method, uri, response, error, attempt, monotonic() - started, waited,
+                   kwargs.get('stream', False), lane)
+        if(error!=None): raise error
+        self._invalidate(method, uri)
+        return self._check(response, ok)
+
+
+    # Calls every hook with one event per request(retries included):
+    # method, endpoint(template, see endpoint_template), status(None on a connection error),
+    # duration(seconds including retries and waits), waited(seconds spent on rate limit
+    # and backoff waits), bytes(response body), retries, remaining(X-RateLimit-Remaining
+    # or None), error(exception class name or None), lane
+    # arg: HTTP method; API URI; final response or None; connection error or None;
+    #      retries(integer); duration(seconds); waited(seconds); stream(boolean); lane name
+    def _emit(self, method, uri, response, error, retries, duration, waited, stream=False, lane=None):
+        if(not self.hooks): return
+        size, remaining = 0, None
+        if(response!=None):
+            if(stream): size = int(response.headers.get('Content-Length', 0))  # body not read yet
+            else: size = len(response.content)
+            remaining = response.headers.get('X-RateLimit-Remaining')
+            if(remaining!=None): remaining = int(remaining)
+        event = {
+            'method': method,
+            'endpoint': endpoint_template(uri),
+            'status': response.status_code if response!=None else None,
+            'duration': duration,
+            'waited': waited,
+            'bytes': size,
+            'retries': retries,
+            'remaining': remaining,
+            'error': type(error).__name__ if error!=None else None,
+            'lane': lane,
+        }
+        for hook in self.hooks:
+            hook(event)
+
+
+    # arg: HTTP method; response object or None; connection error or None; attempt number
+    # return: seconds to wait before sending again, None to give up
+    def _retry_wait(self, method, response, error, attempt):
+        throttled = response!=None and self._throttled(response)
+        if(attempt >= self.retry.retries or not self.retry.retryable(method, response, error)): return None
+        if(throttled): return 0.0  # the limiter already holds every caller until Retry-After
+        return self.retry.delay(attempt, response)
+
+
+    # Drops cached copies of whatever a write went to
+    # arg: HTTP method; API URI
+    def _invalidate(self, method, uri):
+        if(method=='GET'): return
+        if(self.cache!=None): self.cache.invalidate(uri)
+        self.catalog.invalidate(uri)
+
+
+    # Feeds the rate limit headers and the time the request was sent to the limiter
+    # arg: response object
+    # return: True if the request was rate limited and should be sent again
+    def _throttled(self, response):
+        self.limiter.update(response.headers, self.limiter.clock() - response.elapsed.total_seconds())
+        if(response.status_code!=429): return False
+        self.limiter.retry_after(self._retry_after(response))
+        return True
+
+
+    # arg: response object; accepted status codes
+    # return: response object, raises FreshPyError on any other status code
+    def _check(self, response, ok):
+        if(response.status_code not in ok): raise FreshPyError(response)
+        return response
+
+
+    # arg: requests.response object
+    # return: seconds to wait from Retry-After header(float), 60 if missing
+    def _retry_after(self, response):
+        try:
+            return float(response.headers['Retry-After'])
+        except(KeyError, ValueError):
+            return 60.0
+
+
+    # Concurrent GETs for the same URI in the same lane share one request(see
+    # SingleFlight), so an interactive call never waits behind a bulk lane's;
+    # each caller decodes its own copy of the body, so results can be modified freely
     # arg: API URI
+    # optional arg: stream(boolean) to leave the body unread for iter_content
     # return: requests.response object
-    def _get(self, uri):
-        response = requests.get(uri, auth=(self.key,''))
-        if(response.status_code!=200): exit(str(response.status_code) + " Error")
+    def _get(self, uri, stream=False):
+        if(stream): return self._request('GET', uri, stream=True)
+        if(self.flights==None): return self._get_cached(uri)
+        return self.flights.do(('GET', self._lane(), uri), lambda: self._get_cached(uri))
+
+
+    # Served from the response cache when one is configured
+    # arg: API URI
+    # return: requests.response object
+    def _get_cached(self, uri):
+        if(self.cache==None or not self.cache.cacheable(uri)): return self._request('GET', uri)
+        response, headers = self.cache.lookup(uri)
+        if(response!=None): return response
+        response = self.cache.store(uri, self._request('GET', uri, ok=(200,304), headers=headers))
+        if(response.status_code==304): return self._request('GET', uri)  # evicted meanwhile
         return response
 
 
     # arg: API URI; json data(python dict object)
     # return: requests.response object
     def _post(self, uri, data):
-        headers={
-            'Content-type':'application/json',
-            'Accept':'application/json'
-        }
-        response = requests.post(uri, headers=headers, auth=(self.key,''), json=data)
-        if(response.status_code!=200 and response.status_code!=201):
-            exit(str(response.status_code) + " Error")
-        return response
+        headers={'Content-type':'application/json'}
+        return self._request('POST', uri, ok=(200,201), headers=headers, json=data)
 
 
     # arg: API URI; json data(python dict object)
     # return: requests.response object
     def _put(self, uri, data):
-        headers={
-            'Content-type':'application/json',
-            'Accept':'application/json'
-        }
-        response = requests.put(uri, headers=headers, auth=(self.key,''), json=data)
-        if(response.status_code!=200 and response.status_code!=204):
-            exit(str(response.status_code) + " Error")
-        return response
+        headers={'Content-type':'application/json'}
+        return self._request('PUT', uri, ok=(200,204), headers=headers, json=data)
 
 
     # arg: API URI
     # return: requests.response object
     def _delete(self, uri):
-        response = requests.delete(uri, auth=(self.key,''))
-        if(response.status_code!=200 and response.status_code!=204):
-            exit(str(response.status_code) + " Error")
-        return response
+        return self._request('DELETE', uri, ok=(200,204))
+
+
+    # Every endpoint method below is declared through _call/_collect so that
+    # AsyncFreshPy can reuse them by overriding just these hooks
+    # arg: HTTP method; API URI
+    # optional args: json data; json key to return(None for the whole json); message to return instead
+    # return: json for key, whole json or message
+    def _call(self, method, uri, data=None, key=None, message=None):
+        response = self._send(method, uri, data)
+        return self._result(response, key, message)
+
+
+    # arg: HTTP method; API URI; json data
+    # return: response object
+    def _send(self, method, uri, data=None):
+        if(method=='GET'): return self._get(uri)
+        if(method=='POST'): return self._post(uri, data)
+        if(method=='PUT'): return self._put(uri, data)
+        if(method=='DELETE'): return self._delete(uri)
+        raise ValueError("Unsupported method: {}".format(method))
+
+
+    # arg: response object; json key(or None); message(or None)
+    # return: json for key, whole json or message
+    def _result(self, response, key, message):
+        if(message!=None): return message
+        if(key==None): return self.loads(response.content)
+        return self.loads(response.content)[key]
+
+
+    # arg: generator of records
+    # return: list of records
+    def _collect(self, records):
+        return list(records)
 
 
     #------------------- Pagination -------------------#
@@ -81,54 +1231,176 @@ class FreshPy():
             return None
 
 
+    # Follows link headers lazily so callers see the first page before the rest is fetched
+    # arg: API URI of first page; json key holding the records
+    # optional args: workers(integer) to fetch pages concurrently instead
+    #                checkpoint(Checkpoint or file path) to resume an interrupted pull;
+    #                checkpointed pulls follow the link header, so workers is ignored
+    # return: generator of record lists, one per page
+    def _iter_pages(self, uri, key, workers=None, checkpoint=None, fields=None):
+        if(checkpoint!=None):
+            yield from self._iter_pages_checkpointed(uri, key, checkpoint, fields)
+            return
+        if(workers!=None and workers > 1):
+            yield from self._iter_pages_parallel(uri, key, workers, fields)
+            return
+        next_page = uri
+        while(next_page!=None):
+            records, next_page = self._read_page(next_page, key, fields)
+            yield records
+
+
+    # arg: API URI of a page; json key holding the records
+    # optional arg: list of field names to keep
+    # return: (list of records, next page URI or None)
+    def _read_page(self, uri, key, fields=None):
+        if(self.stream_pages):
+            # records are projected as they are decoded, before the next one is read
+            response = self._get(uri, stream=True)
+            try:
+                records = iter_json_array(response.iter_content(16384), key)
+                records = project(records, fields) if(fields!=None) else list(records)
+            finally:
+                response.close()
+        else:
+            response = self._get(uri)
+            records = self.loads(response.content)[key]
+            if(fields!=None): records = project(records, fields)
+        return records, self._paginate(response)
+
+
+    # Replays pages saved by an earlier run, then continues from its last next page
+    # arg: API URI of first page; json key holding the records; Checkpoint or file path
+    # optional arg: list of field names to keep
+    # return: generator of record lists, one per page
+    def _iter_pages_checkpointed(self, uri, key, checkpoint, fields=None):
+        if(not isinstance(checkpoint, Checkpoint)): checkpoint = Checkpoint(checkpoint)
+        next_page = uri
+        for records, next_page in checkpoint.pages():
+            yield records
+        while(next_page!=None):
+            records, next_page = self._read_page(next_page, key, fields)
+            checkpoint.save(records, next_page)
+            yield records
+        # the last page has been handed over; the next pull starts from the first page
+        checkpoint.clear()
+
+
+    # Once the first page shows there is more, keeps `workers` page=N requests
+    # in flight and yields them in page order until a short or empty page.
+    # Every request still waits on the shared rate limiter; keep workers <= pool_size
+    # arg: API URI of first page; json key holding the records; workers(integer)
+    # optional arg: list of field names to keep
+    # return: generator of record lists, one per page
+    def _iter_pages_parallel(self, uri, key, workers, fields=None):
+        records, next_page = self._read_page(uri, key, fields)
+        yield records
+        if(next_page==None): return
+        per_page = len(records)
+        pending = deque()
+        number = 2
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            try:
+                for i in range(workers):
+                    pending.append(self._submit(pool, self._fetch_page, uri, key, number, fields))
+                    number += 1
+                while(pending):
+                    records = pending.popleft().result()
+                    if(records): yield records
+                    if(len(records) < per_page): return
+                    pending.append(self._submit(pool, self._fetch_page, uri, key, number, fields))
+                    number += 1
+            finally:
+                for future in pending: future.cancel()
+
+
+    # arg: API URI of first page; json key holding the records; page number(integer)
+    # optional arg: list of field names to keep
+    # return: list of records on that page
+    def _fetch_page(self, uri, key, number, fields=None):
+        return self._read_page(self._page_uri(uri, number), key, fields)[0]
+
+
+    # arg: API URI; page number(integer)
+    # return: API URI with page=number
+    def _page_uri(self, uri, number):
+        parts = urlsplit(uri)
+        query = [(k, v) for k, v in parse_qsl(parts.query) if k!='page']
+        query.append(('page', str(number)))
+        return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+    # arg: API URI of a filterable list; query parameter name; Filter or query string
+    # return: API URI of the first page of matching records
+    def _filter_uri(self, uri, param, query):
+        return uri + '?' + param + '=' + quote('"' + str(query) + '"')
+
+
+    # arg: API URI of first page; json key holding the records
+    # optional args: workers(integer) to fetch pages concurrently; checkpoint(Checkpoint or path)
+    #                fields(list of field names to keep)
+    # return: generator of records
+    def _iter_records(self, uri, key, workers=None, checkpoint=None, fields=None):
+        for page in self._iter_pages(uri, key, workers, checkpoint, fields):
+            yield from page
+
+
     #------------------- Tickets Calls -------------------#
     # arg:
     # return:
     def create_ticket(self, data):
         uri = self.root_uri + '/tickets'
-        response = self._post(uri, data)
-        return response.json()['ticket']
+        return self._call('POST', uri, data, 'ticket')
 
 
     # arg:
     # return:
     def view_ticket(self, ticket_id):
         uri = self.root_uri + '/tickets/' + str(ticket_id)
-        response = self._get(uri)
-        return response.json()['ticket']
+        return self._call('GET', uri, key='ticket')
 
 
-    # arg:
-    # return:
-    # test and optimize; keep under api limit
-    def all_tickets(self):
-        uri = self.root_uri + '/tickets?per_page=100'
-        response = self._get(uri)
-        tickets = response.json()['tickets']
-        next_page = self._paginate(response)
-        while(next_page!=None):
-            response = self._get(next_page)
-            t = response.json()['tickets']
-            tickets = tickets + t
-            next_page = self._paginate(response)
-            sleep(.5) #to keep under api rate limit
-        return tickets
+    # optional args: per page(integer 1-100); workers(integer) for concurrent page fetches
+    #                updated_since(ISO 8601 string) to only list tickets changed since then
+    #                checkpoint(Checkpoint or file path) to resume an interrupted pull
+    #                fields(list of field names to keep, dotted for nested keys)
+    #                query(Filter or query string) to only list matching tickets, e.g.
+    #                Field('status').isin([2, 3]) & (Field('updated_at') >= '2024-01-01');
+    #                the filter endpoint has a fixed page size and no updated_since
+    # return: generator of ticket jsons
+    def iter_tickets(self, per_page=100, workers=None, updated_since=None, checkpoint=None, fields=None, query=None):
+        if(query!=None):
+            if(updated_since!=None): raise ValueError("Use Field('updated_at') >= date in query instead of updated_since")
+            uri = self._filter_uri(self.root_uri + '/tickets/filter', 'query', query)
+            return self._iter_records(uri, 'tickets', workers, checkpoint, fields)
+        uri = self.root_uri + '/tickets?per_page=' + str(per_page)
+        if(updated_since!=None):
+            uri = uri + '&updated_since=' + quote(updated_since)
+        return self._iter_records(uri, 'tickets', workers, checkpoint, fields)
+
+
+    # optional args: per page(integer 1-100); workers(integer) for concurrent page fetches
+    #                updated_since(ISO 8601 string) to only list tickets changed since then
+    #                checkpoint(Checkpoint or file path) to resume an interrupted pull
+    #                fields(list of field names to keep, dotted for nested keys)
+    #                query(Filter or query string) to only list matching tickets
+    # return: list of ticket jsons
+    def all_tickets(self, per_page=100, workers=None, updated_since=None, checkpoint=None, fields=None, query=None):
+        return self._collect(self.iter_tickets(per_page, workers, updated_since, checkpoint, fields, query))
 
 
     # arg:
     # return:
     def update_ticket(self, ticket_id, data):
         uri = self.root_uri + '/tickets/' +  str(ticket_id)
-        response = self._put(uri, data)
-        return response.json()['ticket']
+        return self._call('PUT', uri, data, 'ticket')
 
 
     # arg:
     # return:
     def delete_ticket(self, ticket_id):
         uri = self.root_uri + '/tickets/' + str(ticket_id)
-        response = self._delete(uri)
-        return "Successfully deleted ticket: {}".format(ticket_id)
+        return self._call('DELETE', uri, message="Successfully deleted ticket: {}".format(ticket_id))
 
 
     #------------------- Requester Calls -------------------#
@@ -136,89 +1408,85 @@ class FreshPy():
     # return:
     def create_requester(self, data):
         uri = self.root_uri + '/requesters'
-        response = self._post(uri, data)
-        return response.json()['requester']
+        return self._call('POST', uri, data, 'requester')
 
 
     # arg:
-    # return: requester json
+    # return: list of requester jsons matching email, or the requester json for id
     def view_requester(self, email=None, id=None):
-        if(email!=None): uri = self.root_uri + '/requesters?email=' + email
-        if(id!=None): uri = self.root_uri + '/requesters/' + str(id)
-        response = self._get(uri)
-        return response.json()['requesters']
-
-
-    # optional arg: per page(integer 1-100)
+        if(id!=None): return self._call('GET', self.root_uri + '/requesters/' + str(id), key='requester')
+        uri = self.root_uri + '/requesters?email=' + email
+        return self._call('GET', uri, key='requesters')
+
+
+    # optional args: per page(integer 1-100); workers(integer) for concurrent page fetches
+    #                checkpoint(Checkpoint or file path) to resume an interrupted pull
+    #                fields(list of field names to keep, dotted for nested keys)
+    #                query(Filter or query string) to only list matching requesters,
+    #                e.g. where(department_id=17000012); fixed page size when filtering
+    # return: generator of requester jsons
+    def iter_requesters(self, per_page=100, workers=None, checkpoint=None, fields=None, query=None):
+        if(query!=None): uri = self._filter_uri(self.root_uri + '/requesters', 'query', query)
+        else: uri = self.root_uri + '/requesters?per_page=' + str(per_page)
+        return self._iter_records(uri, 'requesters', workers, checkpoint, fields)
+
+
+    # optional args: per page(integer 1-100); workers(integer) for concurrent page fetches
+    #                checkpoint(Checkpoint or file path) to resume an interrupted pull
+    #                fields(list of field names to keep, dotted for nested keys)
+    #                query(Filter or query string) to only list matching requesters
     # return: list of requster jsons
-    def all_requesters(self, per_page=100):
-        uri = self.root_uri + '/requesters?per_page=' + str(per_page)
-        response = self._get(uri)
-        requesters = response.json()['requesters']
-        # pagination handling
-        next_page = self._paginate(response)
-        while(next_page!=None):
-            response = self._get(next_page)
-            r = response.json()['requesters']
-            requesters = requesters + r
-            next_page = self._paginate(response)
-        return requesters
+    def all_requesters(self, per_page=100, workers=None, checkpoint=None, fields=None, query=None):
+        return self._collect(self.iter_requesters(per_page, workers, checkpoint, fields, query))
     
     
     # arg:
     # return:
     def requester_fields(self):
         uri = self.root_uri + '/requester_fields'
-        response = self._get(uri)
-        return response.json()['requester_fields']
+        return self._call('GET', uri, key='requester_fields')
 
 
     # arg:
     # return:
     def update_requester(self, requester_id, data):
         uri = self.root_uri + '/requesters/' + str(requester_id)
-        response = self._post(uri, data)
-        return response.json()['requester']
+        return self._call('PUT', uri, data, 'requester')
 
 
     # arg:
     # return:
     def deactivate_requester(self, requester_id):
         uri = self.root_uri + '/requesters/' + str(requester_id)
-        response = self._delete(uri)
-        return "Successfully deactivated requester: {}".format(requester_id)
+        return self._call('DELETE', uri, message="Successfully deactivated requester: {}".format(requester_id))
 
 
     # arg:
     # return:
     def delete_requester(self, requester_id):
         uri = self.root_uri + '/requesters/' + str(requester_id) + '/forget'
-        response = self._delete(uri)
-        return "Successfully deleted requester: {}".format(requester_id)
+        return self._call('DELETE', uri, message="Successfully deleted requester: {}".format(requester_id))
     
     
     # arg:
     # return:
     def requester2agent(self,requester_id):
         uri = self.root_uri + '/requesters/' + str(requester_id) + '/convert_to_agent'
-        response = self._put(uri, None)
-        return response.json()['agent']
+        return self._call('PUT', uri, key='agent')
     
     
     # arg:
     # return:
     def merge_requesters(self,requester_id, secondary_id):
         uri = self.root_uri + '/requesters/'+ str(requester_id) + '/merge?secondary_requesters=' + str(secondary_id)
-        response = self._put(uri,None)
-        return response.json()['requester']
+        return self._call('PUT', uri, key='requester')
     
     
     # arg:
     # return:
     def reactivate_requesters(self,requester_id):
         uri = self.root_uri + '/requesters/'+ str(requester_id) + '/reactivate'
-        response = self._put(uri,None)
-        return response.json()['requester']
+        return self._call('PUT', uri, key='requester')
 
 
     #------------------- Agents Calls -------------------#
@@ -226,8 +1494,7 @@ class FreshPy():
     # return:
     def create_agent(self, data):
         uri = self.root_uri + '/agents'
-        response = self._post(uri, data)
-        return response.json()['agent']
+        return self._call('POST', uri, data, 'agent')
 
 
     # arg:
@@ -235,89 +1502,80 @@ class FreshPy():
     def view_agent(self, email=None, agent_id=None):
         if(email!=None): uri = self.root_uri + '/agents?email=' + email
         if(agent_id!=None): uri = self.root_uri + '/agents/' + str(agent_id)
-        response = self._get(uri)
-        return response.json()['agent']
+        return self._call('GET', uri, key='agent')
 
 
-    # arg:
-    # return:
-    def all_agents(self):
-        uri = self.root_uri + '/agents'
-        response = self._get(uri)
-        agents = response.json()['agents']
-        # pagination handling
-        next_page = self._paginate(response)
-        while(next_page!=None):
-            response = self._get(next_page)
-            r = response.json()['agents']
-            agents = agents + r
-            next_page = self._paginate(response)
-        return agents
+    # optional args: per page(integer 1-100); workers(integer) for concurrent page fetches
+    #                checkpoint(Checkpoint or file path) to resume an interrupted pull
+    #                fields(list of field names to keep, dotted for nested keys)
+    # return: generator of agent jsons
+    def iter_agents(self, per_page=100, workers=None, checkpoint=None, fields=None):
+        uri = self.root_uri + '/agents?per_page=' + str(per_page)
+        return self._iter_records(uri, 'agents', workers, checkpoint, fields)
+
+
+    # optional args: per page(integer 1-100); workers(integer) for concurrent page fetches
+    #                checkpoint(Checkpoint or file path) to resume an interrupted pull
+    #                fields(list of field names to keep, dotted for nested keys)
+    # return: list of agent jsons
+    def all_agents(self, per_page=100, workers=None, checkpoint=None, fields=None):
+        return self._collect(self.iter_agents(per_page, workers, checkpoint, fields))
 
 
     # arg:
     # return:
     def update_agent(self, agent_id, data):
         uri = self.root_uri + '/agents/' + str(agent_id)
-        response = self._put(uri, data)
-        return response.json()['agent']
+        return self._call('PUT', uri, data, 'agent')
     
     
     # arg:
     # return:
     def deactivate_agent(self, agent_id):
         uri = self.root_uri + '/agents/' + str(agent_id)
-        response = self._delete(uri)
-        return "Successfully deactivated agent: {}".format(agent_id)
+        return self._call('DELETE', uri, message="Successfully deactivated agent: {}".format(agent_id))
     
     
     # arg:
     # return:
     def forget_agent(self, agent_id):
         uri = self.root_uri + '/agents/' + str(agent_id) + '/forget'
-        response = self._delete(uri)
-        return "Successfully deleted agent: {}".format(agent_id)
+        return self._call('DELETE', uri, message="Successfully deleted agent: {}".format(agent_id))
     
     
     # arg:
     # return:
     def reactivate_agent(self, agent_id):
         uri = self.root_uri + '/agents/' + str(agent_id) + '/reactivate'
-        response = self._put(uri,None)
-        return response.json()['agent']
+        return self._call('PUT', uri, key='agent')
     
     
     # arg:
     # return:
     def agent2requester(self, agent_id):
         uri = self.root_uri + '/agents/' + str(agent_id) + '/convert_to_requester'
-        response = self._put(uri,None)
-        return response.json()['requester']
+        return self._call('PUT', uri, key='requester')
     
     
     # arg:
     # return:
     def agent_fields(self):
         uri = self.root_uri + '/agent_fields'
-        response = self._get(uri)
-        return response.json()['agent_fields']
+        return self._call('GET', uri, key='agent_fields')
     
     
     #------------------- Agent Role Calls -------------------#
     # arg:
     # return:
-    def (self, role_id):
+    def view_role(self, role_id):
         uri = self.root_uri + '/roles/' + str(role_id)
-        response = self._get(uri)
-        return response.json()['role']
+        return self._call('GET', uri, key='role')
 
 
-    # arg:
-    # return:
+    # return: list of role jsons from every page
     def all_roles(self):
-        uri = self.root_uri + '/roles'
-        response = self._get(uri)
-        return response.json()['roles']
+        uri = self.root_uri + '/roles?per_page=100'
+        return self._collect(self._iter_records(uri, 'roles'))
 
     
     #------------------- Agent Group Calls -------------------#
@@ -325,40 +1583,34 @@ class FreshPy():
     # return:
     def create_agent_group(self, group_json):
         uri = self.root_uri + '/groups'
-        response = self._post(uri, group_json)
-        return response.json()['group']
+        return self._call('POST', uri, group_json, 'group')
 
 
     # arg:
     # return:
     def view_agent_group(self, group_id):
         uri = self.root_uri + '/groups/' + str(group_id)
-        response = self._get(uri)
-        return response.json()['group']
+        return self._call('GET', uri, key='group')
 
 
-    # arg:
-    # return:
+    # return: list of agent group jsons from every page
     def all_agent_groups(self):
-        uri = self.root_uri + '/groups'
-        response = self._get(uri)
-        return response.json()['groups']
+        uri = self.root_uri + '/groups?per_page=100'
+        return self._collect(self._iter_records(uri, 'groups'))
 
 
     # arg:
     # return:
     def update_agent_group(self, group_id, data):
         uri = self.root_uri + '/groups/' + str(group_id)
-        response = self._put(uri, data)
-        return response.json()['group']
+        return self._call('PUT', uri, data, 'group')
 
 
     # arg:
     # return:
     def delete_agent_group(self, group_id):
         uri = self.root_uri + '/groups/' + str(group_id)
-        response = self._delete(uri)
-        return "Successfully deleted agent group: {}".format(group_id)
+        return self._call('DELETE', uri, message="Successfully deleted agent group: {}".format(group_id))
 
 
     #------------------- Requester Group Calls -------------------#
@@ -366,71 +1618,66 @@ class FreshPy():
     # return:
     def create_requester_group(self, data):
         uri = self.root_uri + '/requester_groups'
-        response = self._post(uri, data)
-        return response.json()['requester_group']
+        return self._call('POST', uri, data, 'requester_group')
 
     # arg:
     # return:
     def view_requester_group(self, group_id):
         uri = self.root_uri + '/requester_groups/' + str(group_id)
-        response = self._get(uri)
-        return response.json()['requester_group']
+        return self._call('GET', uri, key='requester_group')
 
 
     # optional arg: per page(integer 1-100)
-    # return: requester group json
+    # return: list of requester group jsons from every page
     def all_requester_groups(self, per_page=100):
         uri = self.root_uri + '/requester_groups?per_page=' + str(per_page)
-        response = self._get(uri)
-        return response.json()
+        return self._collect(self._iter_records(uri, 'requester_groups'))
 
     # arg:
     # return:
     def update_requester_group(self, group_id, data):
         uri = self.root_uri + '/requester_groups/' + str(group_id)
-        response = self._put(uri, data)
-        return response.json()['requester_group']
+        return self._call('PUT', uri, data, 'requester_group')
 
 
     # arg:
     # return:
     def delete_requester_group(self, group_id):
         uri = self.root_uri + '/requester_groups/' + str(group_id)
-        response = self._delete(uri)
-        return "Successfully deleted requester_group: {}".format(group_id)
+        return self._call('DELETE', uri, message="Successfully deleted requester_group: {}".format(group_id))
     
     
     # arg:
     # return:
     def add_group_member(self, group_id, requester_id):
         uri = self.root_uri+ '/requester_groups/'+ str(group_id) +'/members/' + str(requester_id)
-        response = self._post(uri, None)
-        return "Successfully added requester: {0} to group: {1}".format(requester_id, group_id)
+        return self._call('POST', uri, message="Successfully added requester: {0} to group: {1}".format(requester_id, group_id))
     
     
     # arg:
     # return:
     def delete_group_member(self, group_id, requester_id):
         uri = self.root_uri + '/requester_groups/' + str(group_id) + '/members/' + str(requester_id)
-        response = self._delete(uri)
-        return "Successfully removed requester: {0} from requester_group: {1}".format(group_id,requester_id)
+        return self._call('DELETE', uri, message="Successfully removed requester: {0} from requester_group: {1}".format(group_id,requester_id))
 
 
     # arg: group id(integer)
-    # optional arg: per page(integer 1-100)
-    # return: list of requester jsons
-    def requester_group_members(self, group_id, per_page=100):
+    # optional args: per page(integer 1-100); workers(integer) for concurrent page fetches
+    #                checkpoint(Checkpoint or file path) to resume an interrupted pull
+    #                fields(list of field names to keep, dotted for nested keys)
+    # return: generator of requester jsons
+    def iter_requester_group_members(self, group_id, per_page=100, workers=None, checkpoint=None, fields=None):
         uri = self.root_uri+ '/requester_groups/'+ str(group_id) +'/members?per_page=' + str(per_page)
-        response = self._get(uri)
-        requesters = response.json()['requesters']
-        # pagination handling
-        next_page = self._paginate(response)
-        while(next_page!=None):
-            response = self._get(next_page)
-            r = response.json()['requesters']
-            requesters = requesters + r
-            next_page = self._paginate(response)
-        return requesters
+        return self._iter_records(uri, 'requesters', workers, checkpoint, fields)
+
+
+    # arg: group id(integer)
+    # optional args: per page(integer 1-100); workers(integer) for concurrent page fetches
+    #                checkpoint(Checkpoint or file path) to resume an interrupted pull
+    #                fields(list of field names to keep, dotted for nested keys)
+    # return: list of requester jsons
+    def requester_group_members(self, group_id, per_page=100, workers=None, checkpoint=None, fields=None):
+        return self._collect(self.iter_requester_group_members(group_id, per_page, workers, checkpoint, fields))
         
     
     #------------------- Product Calls -------------------#
@@ -438,40 +1685,34 @@ class FreshPy():
     # return:
     def create_product(self, data):
         uri = self.root_uri + '/products'
-        response = self._post(uri, data)
-        return response.json()['product']
+        return self._call('POST', uri, data, 'product')
 
 
     # arg:
     # return:
     def view_product(self, product_id):
         uri = self.root_uri + '/products/' + str(product_id)
-        response = self._get(uri)
-        return response.json()['product']
+        return self._call('GET', uri, key='product')
 
 
-    # arg:
-    # return:
+    # return: list of product jsons from every page
     def all_products(self):
-        uri = self.root_uri + '/products'
-        response = self._get(uri)
-        return response.json()['products']
+        uri = self.root_uri + '/products?per_page=100'
+        return self._collect(self._iter_records(uri, 'products'))
 
 
     # arg:
     # return:
     def update_products(self, product_id, data):
         uri = self.root_uri + '/products/' + str(product_id)
-        response = self._put(uri, data)
-        return response.json()['product']
+        return self._call('PUT', uri, data, 'product')
 
 
     # arg:
     # return:
     def delete_product(self, product_id):
         uri = self.root_uri + '/products/' + str(product_id)
-        response = self._delete(uri)
-        return "Successfully deleted product: {}".format(product_id)
+        return self._call('DELETE', uri, message="Successfully deleted product: {}".format(product_id))
     
     
     #------------------- Vendor Calls -------------------#
@@ -479,58 +1720,59 @@ class FreshPy():
     # return:
     def create_vendor(self, data):
         uri = self.root_uri + '/vendors'
-        response = self._post(uri, data)
-        return response.json()['vendor']
+        return self._call('POST', uri, data, 'vendor')
 
     # arg:
     # return:
     def view_vendor(self, vendor_id):
         uri = self.root_uri + '/vendors/' + str(vendor_id)
-        response = self._get(uri)
-        return response.json()['vendor']
+        return self._call('GET', uri, key='vendor')
 
 
-    # arg:
-    # return:
+    # return: list of vendor jsons from every page
     def all_vendors(self):
-        uri = self.root_uri + '/vendors'
-        response = self._get(uri)
-        return response.json()['vendors']
+        uri = self.root_uri + '/vendors?per_page=100'
+        return self._collect(self._iter_records(uri, 'vendors'))
 
 
     # arg:
     # return:
     def update_vendor(self, vendor_id, data):
         uri = self.root_uri + '/vendors/' + str(vendor_id)
-        response = self._put(uri, data)
-        return response.json()['vendor']
+        return self._call('PUT', uri, data, 'vendor')
 
 
     # arg:
     # return:
     def delete_vendor(self, vendor_id):
         uri = self.root_uri + '/vendors/' + str(vendor_id)
-        response = self._delete(uri)
-        return "Successfully deleted vendor: {}".format(vendor_id)
+        return self._call('DELETE', uri, message="Successfully deleted vendor: {}".format(vendor_id))
 
 
     #------------------- Asset Calls -------------------#
-    # arg:
-    # return: list of asset jsons
-    def list_assets(self, type_fields=False, per_page=100):
-        uri = self.root_uri + '/assets?per_page=' + str(per_page)
+    # optional args: include type_fields(boolean); per page(integer 1-100)
+    #                workers(integer) for concurrent page fetches
+    #                checkpoint(Checkpoint or file path) to resume an interrupted pull
+    #                fields(list of field names to keep, dotted for nested keys)
+    #                query(Filter or query string) to only list matching assets,
+    #                e.g. where(asset_type_id=17000025); fixed page size when filtering
+    # return: generator of asset jsons
+    def iter_assets(self, type_fields=False, per_page=100, workers=None, checkpoint=None, fields=None, query=None):
+        if(query!=None): uri = self._filter_uri(self.root_uri + '/assets', 'filter', query)
+        else: uri = self.root_uri + '/assets?per_page=' + str(per_page)
         if(type_fields==True):
             uri = uri + '&include=type_fields'
-        response = self._get(uri)
-        assets = response.json()['assets']
-        # pagination handling
-        next_page = self._paginate(response)
-        while(next_page!=None):
-            response = self._get(next_page)
-            r = response.json()['assets']
-            assets = assets + r
-            next_page = self._paginate(response)
-        return assets
+        return self._iter_records(uri, 'assets', workers, checkpoint, fields)
+
+
+    # optional args: include type_fields(boolean); per page(integer 1-100)
+    #                workers(integer) for concurrent page fetches
+    #                checkpoint(Checkpoint or file path) to resume an interrupted pull
+    #                fields(list of field names to keep, dotted for nested keys)
+    #                query(Filter or query string) to only list matching assets
+    # return: list of asset jsons
+    def list_assets(self, type_fields=False, per_page=100, workers=None, checkpoint=None, fields=None, query=None):
+        return self._collect(self.iter_assets(type_fields, per_page, workers, checkpoint, fields, query))
 
 
     # arg:
@@ -539,33 +1781,28 @@ class FreshPy():
         uri = self.root_uri + '/assets/' + str(display_id)
         if(type_fields==True):
             uri = uri + '?include=type_fields'
-        response = self._get(uri)
-        asset_data = response.json()['asset']
-        return asset_data
+        return self._call('GET', uri, key='asset')
 
 
     # arg:
     # return: asset json
     def update_asset(self, display_id, data):
         uri = self.root_uri + '/assets/' + str(display_id)
-        response = self._put(uri, data)
-        return response.json()['asset']
+        return self._call('PUT', uri, data, 'asset')
 
 
     # arg:
     # return: Success message or Error
     def delete_asset(self, display_id):
         uri = self.root_uri + '/assets/' + str(display_id)
-        response = self._delete(uri)
-        return "Successfully deleted asset {}".format(display_id)
+        return self._call('DELETE', uri, message="Successfully deleted asset {}".format(display_id))
 
 
     # arg:
     # return: Success message or Error
     def perm_delete_asset(self, display_id):
         uri = self.root_uri + '/assets/' + str(display_id) + "/delete_forever"
-        response = self._put(uri, None)
-        return "Permanently deleted asset {}".format(display_id)
+        return self._call('PUT', uri, message="Permanently deleted asset {}".format(display_id))
 
 
     #------------------- Asset Type Calls -------------------#
@@ -573,40 +1810,34 @@ class FreshPy():
     # return:
     def create_asset_type(self, data):
         uri = self.root_uri + '/asset_types'
-        response = self._post(uri, data)
-        return response.json()['asset_type']
+        return self._call('POST', uri, data, 'asset_type')
     
     
     # arg:
     # return:
     def view_asset_type(self, id):
         uri = self.root_uri + '/asset_types/' + str(id)
-        response = self._get(uri)
-        return response.json()['asset_type']
+        return self._call('GET', uri, key='asset_type')
 
     
-    # arg:
-    # return:
+    # return: list of asset type jsons from every page
     def list_asset_types(self):
         uri = self.root_uri + '/asset_types?per_page=100'
-        response = self._get(uri)
-        return response.json()['asset_types']
+        return self._collect(self._iter_records(uri, 'asset_types'))
     
     
     # arg:
     # return:
     def update_asset_type(self, id, data):
         uri = self.root_uri + '/asset_types/' + str(id)
-        response = self._put(uri, data)
-        return response.json()['asset_type']
+        return self._call('PUT', uri, data, 'asset_type')
     
     
     # arg:
     # return:
     def delete_asset_type(self, id):
         uri = self.root_uri + '/asset_types/' + str(id)
-        response = self._delete(uri)
-        return "Successfully deleted asset type: {}".format(id)
+        return self._call('DELETE', uri, message="Successfully deleted asset type: {}".format(id))
     
     
     #------------------- Department Calls -------------------#
@@ -614,81 +1845,69 @@ class FreshPy():
     # return:
     def create_department(self, data):
         uri = self.root_uri + '/departments'
-        response = self._post(uri, data)
-        return response.json()['department']
+        return self._call('POST', uri, data, 'department')
     
 
     # arg:
     # return:
     def view_department(self, id):
         uri = self.root_uri + '/departments/' + str(id)
-        response = self._get(uri)
-        return response.json()['department']
+        return self._call('GET', uri, key='department')
     
 
-    # arg:
-    # return:
+    # return: list of department jsons from every page
     def all_departments(self):
-        uri = self.root_uri + '/departments'
-        response = self._get(uri)
-        return response.json()['departments']
+        uri = self.root_uri + '/departments?per_page=100'
+        return self._collect(self._iter_records(uri, 'departments'))
     
 
     # arg:
     # return:
     def update_department(self, id, data):
         uri = self.root_uri + '/departments/' + str(id)
-        response = self._put(uri, data)
-        return response.json()['department']
+        return self._call('PUT', uri, data, 'department')
     
 
     # arg:
     # return:
     def delete_department(self, id):
         uri = self.root_uri + '/departments/' + str(id)
-        response = self._delete(uri)
-        return "Successfully deleted department: {}".format(id)
+        return self._call('DELETE', uri, message="Successfully deleted department: {}".format(id))
     
     
     #------------------- Solution Category Calls -------------------#
     # arg:
     # return:
     def create_solution_category(self, data):
-        uri = self.root_uri + '/solutions​/categories'
-        response = self._post(uri, data)
-        return response.json()['category']
+        uri = self.root_uri + '/solutions/categories'
+        return self._call('POST', uri, data, 'category')
 
 
     # arg:
     # return:
     def view_solution_category(self, id):
-        uri = self.root_uri + '/solutions​/categories/' + str(id)
-        response = self._get(uri)
-        return response.json()['category']
+        uri = self.root_uri + '/solutions/categories/' + str(id)
+        return self._call('GET', uri, key='category')
 
 
-    # arg:
-    # return:
+    # return: list of solution category jsons from every page
     def all_solution_categories(self):
-        uri = self.root_uri + '/solutions​/categories'
-        response = self._get(uri)
-        return response.json()['categories']
+        uri = self.root_uri + '/solutions/categories?per_page=100'
+        return self._collect(self._iter_records(uri, 'categories'))
 
 
     # arg:
     # return:
     def update_solution_category(self, id, data):
-        uri = self.root_uri + '/solutions​/categories/' + str(id)
-        response = self._put(uri, data)
-        return response.json()['category']
+        uri = self.root_uri + '/solutions/categories/' + str(id)
+        return self._call('PUT', uri, data, 'category')
 
 
     # arg:
     # return:
     def delete_solution_category(self, id):
-        uri = self.root_uri + '/solutions​/categories/' + str(id)
-        response = self._delete(uri)
-        return "Successfully deleted solution category: {}".format(id)
+        uri = self.root_uri + '/solutions/categories/' + str(id)
+        return self._call('DELETE', uri, message="Successfully deleted solution category: {}".format(id))
     
     
     #------------------- Solution Folder Calls -------------------#
@@ -696,108 +1915,265 @@ class FreshPy():
     # return:
     def create_solution_folder(self, data):
         uri = self.root_uri + '/solutions/folders'
-        response = self._post(uri, data)
-        return response.json()['folder']
+        return self._call('POST', uri, data, 'folder')
 
 
     # arg:
     # return:
     def view_solution_folder(self, id):
         uri = self.root_uri + '/solutions/folders/' + str(id)
-        response = self._get(uri)
-        return response.json()['folder']
+        return self._call('GET', uri, key='folder')
 
 
-    # arg:
-    # return:
+    # return: list of solution folder jsons from every page
     def all_solution_folder(self):
-        uri = self.root_uri + '/solutions/folders'
-        response = self._get(uri)
-        return response.json()['folders']
+        uri = self.root_uri + '/solutions/folders?per_page=100'
+        return self._collect(self._iter_records(uri, 'folders'))
 
 
     # arg:
     # return:
     def update_solution_folder(self, id, data):
         uri = self.root_uri + '/solutions/folders/' + str(id)
-        response = self._put(uri, data)
-        return response.json()['folder']
+        return self._call('PUT', uri, data, 'folder')
 
 
     # arg:
     # return:
     def delete_solution_folder(self, id):
         uri = self.root_uri + '/solutions/folders/' + str(id)
-        response = self._delete(uri)
-        return "Successfully deleted Solution Folder: {}".format(id)
+        return self._call('DELETE', uri, message="Successfully deleted Solution Folder: {}".format(id))
     
     
     #------------------- Canned Response Calls -------------------#
-    # arg:
-    # return:
+    # return: list of canned response folder jsons from every page
     def all_canned_response_folders(self):
-        uri = self.root_uri + '/canned_response_folders'
-        response = self._get(uri)
-        return response.json()['canned_response_folders']
+        uri = self.root_uri + '/canned_response_folders?per_page=100'
+        return self._collect(self._iter_records(uri, 'canned_response_folders'))
 
 
     # arg:
     # return:
     def view_canned_response_folder(self, id):
         uri = self.root_uri + '/canned_response_folders/' + str(id)
-        response = self._get(uri)
-        return response.json()['canned response_folder']
+        return self._call('GET', uri, key='canned_response_folder')
 
 
-    # arg:
-    # return:
+    # arg: canned response folder id
+    # return: list of canned response jsons from every page
     def all_canned_responses_in_folder(self, id):
-        uri = self.root_uri + '/canned_response_folders/' + str(id) + '/canned_responses'
-        response = self._get(uri)
-        return response.json()['canned_responses']
+        uri = self.root_uri + '/canned_response_folders/' + str(id) + '/canned_responses?per_page=100'
+        return self._collect(self._iter_records(uri, 'canned_responses'))
 
 
-    # arg:
-    # return:
+    # return: list of canned response jsons from every page
     def all_canned_responses(self):
-        uri = self.root_uri + '/canned_responses'
-        response = self._get(uri)
-        return response.json()['canned_responses']
+        uri = self.root_uri + '/canned_responses?per_page=100'
+        return self._collect(self._iter_records(uri, 'canned_responses'))
 
 
     # arg:
     # return:
     def view_canned_response(self, id):
         uri = self.root_uri + '/canned_responses/' + str(id)
-        response = self._get(uri)
-        return response.json()['']
+        return self._call('GET', uri, key='canned_response')
+
+
+    #------------------- Bulk Calls -------------------#
+    # Runs func(*args) for every args tuple on a bounded worker pool; all
+    # writes share the rate limiter and retry policy, and one failure never
+    # stops the rest
+    # arg: endpoint method; iterable of argument tuples
+    # optional arg: workers(integer)
+    # return: BulkReport
+    def _bulk(self, func, items, workers=8):
+        report = BulkReport()
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for args in items:
+                pending.append((args, self._submit(pool, func, *args)))
+                if(len(pending) >= workers * 2): self._settle(pending.popleft(), report)
+            while(pending):
+                self._settle(pending.popleft(), report)
+        return report
+
+
+    # arg: (argument tuple, future) pair; BulkReport to record the outcome in
+    def _settle(self, job, report):
+        args, future = job
+        try:
+            result = future.result()
+        except(Exception) as e:
+            report.failed.append((args, e))
+            return
+        if(result is _UNCHANGED): report.skipped.append(args)
+        else: report.succeeded.append((args, result))
+
+
+    # arg: iterable of (display_id, data) tuples
+    # optional arg: workers(integer)
+    # return: BulkReport
+    def bulk_update_assets(self, items, workers=8):
+        return self._bulk(self.update_asset, items, workers)
+
+
+    # arg: iterable of (ticket_id, data) tuples
+    # optional arg: workers(integer)
+    # return: BulkReport
+    def bulk_update_tickets(self, items, workers=8):
+        return self._bulk(self.update_ticket, items, workers)
+
+
+    # arg: iterable of ticket data dicts
+    # optional arg: workers(integer)
+    # return: BulkReport with (data,) items
+    def bulk_create_tickets(self, items, workers=8):
+        return self._bulk(self.create_ticket, ((data,) for data in items), workers)
+
+
+    # arg: iterable of (requester_id, data) tuples
+    # optional arg: workers(integer)
+    # return: BulkReport
+    def bulk_update_requesters(self, items, workers=8):
+        return self._bulk(self.update_requester, items, workers)
+
+
+    # arg: iterable of requester data dicts
+    # optional arg: workers(integer)
+    # return: BulkReport with (data,) items
+    def bulk_create_requesters(self, items, workers=8):
+        return self._bulk(self.create_requester, ((data,) for data in items), workers)
+
+
+    #------------------- Apply Calls -------------------#
+    # Idempotent writes: each record is compared with the desired data and only
+    # the changed fields are sent; records that already match are not written
+    # at all and end up in report.skipped. Records missing from current are
+    # fetched first, which costs a request each, so pass the list you already
+    # have(e.g. from list_assets) to make a steady state run nearly free. A
+    # {id: record} dict is used as is, so callers applying in chunks index once
+    # arg: update method; view method(record id, data); record id key;
+    #      iterable of (record id, desired data); current records(list or {id: record} or None)
+    # optional arg: workers(integer)
+    # return: BulkReport
+    def _apply(self, update, view, key, items, current, workers=8):
+        if(current==None): current = {}
+        elif(not isinstance(current, dict)): current = {record[key]: record for record in current}
+        return self._bulk(lambda record_id, data: self._apply_one(update, view, current, record_id, data), items, workers)
+
+
+    # arg: update method; view method; {record id: record json}; record id; desired data
+    # return: update response json or _UNCHANGED
+    def _apply_one(self, update, view, index, record_id, data):
+        record = _lookup(index, record_id)
+        if(record==None): record = view(record_id, data)
+        changes = diff(record, data)
+        if(not changes): return _UNCHANGED
+        return update(record_id, changes)
+
+
+    # arg: iterable of (display_id, desired data) tuples
+    # optional args: current asset jsons(list or {display_id: asset}; fetched when missing,
+    #                with type_fields if the data sets any); workers(integer)
+    # return: BulkReport; skipped holds the assets that already matched
+    def apply_assets(self, items, current=None, workers=8):
+        view = lambda display_id, data: self.view_asset(display_id, 'type_fields' in data)
+        return self._apply(self.update_asset, view, 'display_id', items, current, workers)
+
+
+    # arg: iterable of (requester_id, desired data) tuples
+    # optional args: current requester jsons(list or {id: requester}; fetched when missing); workers(integer)
+    # return: BulkReport; skipped holds the requesters that already matched
+    def apply_requesters(self, items, current=None, workers=8):
+        view = lambda requester_id, data: self.view_requester(id=requester_id)
+        return self._apply(self.update_requester, view, 'id', items, current, workers)
 
 
     #------------------- Author Specific Functions -------------------#
-    # last_login_by field needs to be updated if run on different freshservice domain
-    # can this be optimized?
     # Last user is AzureAD user(FirstnameLastname) and requesters are synced from Google
-    def lastUser2usedBy_staff(self, asset, requester_list):
-        asset_id = asset['display_id']
-        last_login = str(asset['type_fields']['last_login_by_17000000908'])
-        if(asset['type_fields']['last_login_by_17000000908']==None): return
-        for requester in requester_list:
-            requester_name = str(requester['first_name']) + str(requester['last_name'])
-            if(last_login.lower()==requester_name.lower()):
-                data = {'user_id': int(requester['id'])}
-                response = self.update_asset(asset_id,data)
-                print(response)
+    # last_login_by field differs per freshservice domain; pass field= to override
+    # arg: asset json(with type_fields); requester list or LastLoginMatcher built with by='name'
+    def lastUser2usedBy_staff(self, asset, requester_list, field=LAST_LOGIN_FIELD):
+        return self._lastUser2usedBy(asset, requester_list, 'name', field)
 
 
     # match email for google synced requesters to Chromebook last sign in email
-    # last_login_by field needs to be updated if run on different freshservice domain
-    def lastUser2usedBy_students(self, asset, requester_list):
-        asset_id = asset['display_id']
-        last_login = str(asset['type_fields']['last_login_by_17000000908'])
-        if(asset['type_fields']['last_login_by_17000000908']==None): return
+    # arg: asset json(with type_fields); requester list or LastLoginMatcher built with by='email'
+    def lastUser2usedBy_students(self, asset, requester_list, field=LAST_LOGIN_FIELD):
+        return self._lastUser2usedBy(asset, requester_list, 'email', field)
+
+
+    def _lastUser2usedBy(self, asset, requester_list, by, field):
+        matcher = requester_list
+        if(not isinstance(matcher, LastLoginMatcher)):
+            matcher = LastLoginMatcher(requester_list, by, field)
+        for display_id, data in matcher.changes([asset]):
+            response = self.update_asset(display_id, data)
+            print(response)
+
+
+    # Sets Used By on every asset from its last login in one pass; the requester
+    # index is built once and assets already assigned to the match are skipped
+    # arg: list or iterator of asset jsons(with type_fields); list of requester jsons
+    # optional args: by('name' or 'email'); last login field key; workers(integer)
+    # return: BulkReport of the updates actually sent; skipped holds the assets already assigned
+    def assign_last_users(self, assets, requester_list, by='name', field=LAST_LOGIN_FIELD, workers=8):
+        matcher = LastLoginMatcher(requester_list, by, field)
+        assets = list(assets)  # read twice: matched here and indexed by apply_assets
+        return self.apply_assets(matcher.desired(assets), assets, workers)
+
+
+class LastLoginMatcher():
+    """
+        Hash index from normalized requester name(FirstnameLastname) or
+        primary email to requester id, matched against an asset's last login field
+    """
+    # arg: list of requester jsons
+    # optional args: by('name' or 'email'); last login field key in type_fields
+    def __init__(self, requester_list, by='name', field=LAST_LOGIN_FIELD):
+        if(by not in ('name', 'email')): raise ValueError("by must be 'name' or 'email'")
+        self.by = by
+        self.field = field
+        self.index = {}
+        # later requesters win on duplicate keys, as the old per-asset scan did
         for requester in requester_list:
-            requester_email = str(requester['primary_email'])
-            if(last_login.lower()==requester_email.lower()):
-                data = {'user_id': int(requester['id'])}
-                response = self.update_asset(asset_id,data)
-                print(response)
+            self.index[self._requester_key(requester)] = int(requester['id'])
+
+
+    # arg: requester json
+    # return: normalized name or email
+    def _requester_key(self, requester):
+        if(self.by=='email'): return self.normalize(requester['primary_email'])
+        return self.normalize(str(requester['first_name']) + str(requester['last_name']))
+
+
+    # arg: any value
+    # return: lowercased string without surrounding whitespace
+    @staticmethod
+    def normalize(value):
+        return str(value).strip().lower()
+
+
+    # arg: asset json
+    # return: matching requester id or None
+    def match(self, asset):
+        last_login = (asset.get('type_fields') or {}).get(self.field)
+        if(last_login==None): return None
+        return self.index.get(self.normalize(last_login))
+
+
+    # arg: iterable of asset jsons
+    # return: generator of (display_id, {'user_id': id}) for every asset with a match
+    def desired(self, assets):
+        for asset in assets:
+            user_id = self.match(asset)
+            if(user_id!=None): yield (asset['display_id'], {'user_id': user_id})
+
+
+    # arg: iterable of asset jsons
+    # return: generator of (display_id, {'user_id': id}) for assets that need a new owner
+    def changes(self, assets):
+        for asset in assets:
+            user_id = self.match(asset)
+            if(user_id!=None and asset.get('user_id')!=user_id):
+                yield (asset['display_id'], {'user_id': user_id})
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+# Whole-tenant snapshots of a FreshService instance
+# snapshot() pulls every collection at once on a worker pool; all requests go
+# through the one FreshPy instance, so they share its connection pool and rate
+# limiter. The result is a single timestamped bundle that saves to and loads
+# from json(gzipped for .gz paths).
+#   snap = snapshot(FS, workers=8)
+#   snap.save('audit-2024-01-07.json.gz')
+#   old = Snapshot.load('audit-2023-12-31.json.gz')
+import gzip
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# collection: (FreshPy method, keyword args, takes page workers)
+COLLECTIONS = {
+    'requesters': ('all_requesters', {}, True),
+    'agents': ('all_agents', {}, True),
+    'assets': ('list_assets', {'type_fields': True}, True),
+    'roles': ('all_roles', {}, False),
+    'agent_groups': ('all_agent_groups', {}, False),
+    'requester_groups': ('all_requester_groups', {}, False),
+    'products': ('all_products', {}, False),
+    'vendors': ('all_vendors', {}, False),
+    'asset_types': ('list_asset_types', {}, False),
+    'departments': ('all_departments', {}, False),
+    'solution_categories': ('all_solution_categories', {}, False),
+    'solution_folders': ('all_solution_folder', {}, False),
+    'canned_response_folders': ('all_canned_response_folders', {}, False),
+    'canned_responses': ('all_canned_responses', {}, False),
+    'agent_fields': ('agent_fields', {}, False),
+    'requester_fields': ('requester_fields', {}, False),
+    # every ticket ever; left out unless asked for by name
+    'tickets': ('all_tickets', {'updated_since': '1970-01-01T00:00:00Z'}, True),
+}
+DEFAULT = [name for name in COLLECTIONS if name!='tickets']
+
+
+# return: current UTC time as an ISO 8601 string
+def _now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class Snapshot():
+    """
+        Timestamped bundle of collections: snap['assets'] is the list of every
+        asset. Collections that failed are listed in errors instead
+    """
+    # arg: {name: list of records}
+    # optional args: started_at/finished_at(ISO 8601 strings); domain(API root URI); {name: error message}
+    def __init__(self, collections, started_at=None, finished_at=None, domain=None, errors=None):
+        self.collections = collections
+        self.started_at = started_at
+        self.finished_at = finished_at
+        self.domain = domain
+        self.errors = errors or {}
+
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+
+    def __contains__(self, name):
+        return name in self.collections
+
+
+    def __repr__(self):
+        counts = ', '.join('{0}={1}'.format(name, len(records)) for name, records in self.collections.items())
+        return "Snapshot({0}; {1}; errors={2})".format(self.started_at, counts, len(self.errors))
+
+
+    # return: True if every collection was fetched
+    @property
+    def ok(self):
+        return len(self.errors)==0
+
+
+    # Written to a temporary file first so an interrupted save never replaces a good one
+    # arg: file path, gzipped if it ends in .gz
+    def save(self, path):
+        data = {'started_at': self.started_at, 'finished_at': self.finished_at, 'domain': self.domain,
+                'errors': self.errors, 'collections': self.collections}
+        temp = path + '.tmp'
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(temp, 'wt', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp, path)
+
+
+    # arg: file path written by save()
+    # return: Snapshot
+    @classmethod
+    def load(cls, path):
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['collections'], data['started_at'], data['finished_at'], data['domain'], data['errors'])
+
+
+# Fetches collections concurrently; large ones also fetch their pages concurrently.
+# Keep workers * page_workers within the FreshPy pool_size
+# arg: FreshPy instance
+# optional args: list of collection names(defaults to everything but tickets);
+#                workers(collections fetched at once); page_workers(pages per large collection)
+# return: Snapshot
+def snapshot(fs, names=None, workers=8, page_workers=2):
+    if(names==None): names = DEFAULT
+    for name in names:
+        if(name not in COLLECTIONS): raise ValueError("Unknown collection: {}".format(name))
+
+    def fetch(name):
+        method, kwargs, paged = COLLECTIONS[name]
+        if(paged and page_workers > 1): kwargs = dict(kwargs, workers=page_workers)
+        return getattr(fs, method)(**kwargs)
+
+    started_at = _now()
+    collections, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [(name, fs._submit(pool, fetch, name)) for name in names]
+        for name, future in futures:
+            try:
+                collections[name] = future.result()
+            except(Exception) as e:
+                errors[name] = "{0}: {1}".format(type(e).__name__, e)
+    return Snapshot(collections, started_at, _now(), fs.root_uri, errors)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+# Set-based directory sync to FreshService requesters and requester groups
+# Directory users(e.g. from Google Workspace) and FreshService requesters are
+# indexed by normalized email, so every comparison is a dict/set lookup and a
+# sync of tens of thousands of users is planned in one pass over each side.
+# The plan is then applied with concurrent calls under the FreshPy rate limiter.
+#   sync = DirectorySync(FS)
+#   users = [google_user(u) for u in google_users]
+#   plan = sync.plan(users, {STAFF_GROUP: staff_emails, STUDENT_GROUP: student_emails})
+#   print(plan); print('\n'.join(plan.describe()))      # dry run
+#   report = sync.apply(plan)
+from concurrent.futures import ThreadPoolExecutor
+
+from FreshPy import BulkReport
+
+
+# arg: email(string or None)
+# return: email key used for every comparison
+def normalize_email(email):
+    if(email==None): return None
+    return str(email).strip().lower()
+
+
+# arg: Google Workspace directory user json
+# return: requester data for the sync
+def google_user(user):
+    return {
+        'primary_email': user['primaryEmail'].strip(),
+        'first_name': user['name']['givenName'] if 'name' in user else user['givenName'],
+        'last_name': user['name']['familyName'] if 'name' in user else user['familyName'],
+    }
+
+
+class SyncPlan():
+    """
+        Changes needed to make FreshService match the directory. Nothing is
+        sent until DirectorySync.apply(plan)
+    """
+    def __init__(self):
+        self.creates = []         # requester data dicts
+        self.updates = []         # (requester_id, changed fields)
+        self.reactivations = []   # requester ids
+        self.deactivations = []   # requester ids
+        self.group_adds = []      # (group_id, requester id or normalized email of a created requester)
+        self.group_removals = []  # (group_id, requester_id)
+        self.emails = {}          # requester id: email, for describe()
+
+
+    def __len__(self):
+        return (len(self.creates) + len(self.updates) + len(self.reactivations) +
+                len(self.deactivations) + len(self.group_adds) + len(self.group_removals))
+
+
+    def __repr__(self):
+        return ("SyncPlan(creates={0}, updates={1}, reactivations={2}, deactivations={3}, "
+                "group_adds={4}, group_removals={5})".format(
+                    len(self.creates), len(self.updates), len(self.reactivations),
+                    len(self.deactivations), len(self.group_adds), len(self.group_removals)))
+
+
+    # return: list of human readable actions, for dry runs
+    def describe(self):
+        name = lambda requester: self.emails.get(requester, requester)
+        lines = ['create {}'.format(data['primary_email']) for data in self.creates]
+        lines += ['update {0} {1}'.format(name(rid), changes) for rid, changes in self.updates]
+        lines += ['reactivate {}'.format(name(rid)) for rid in self.reactivations]
+        lines += ['deactivate {}'.format(name(rid)) for rid in self.deactivations]
+        lines += ['add {0} to group {1}'.format(name(rid), gid) for gid, rid in self.group_adds]
+        lines += ['remove {0} from group {1}'.format(name(rid), gid) for gid, rid in self.group_removals]
+        return lines
+
+
+class DirectorySync():
+    """
+        Takes a FreshPy instance
+        Optional: concurrent writes, whether to deactivate requesters missing
+        from the users given to plan()(off by default; only turn it on when
+        plan() gets every directory user), scope(function(requester) ->
+        boolean) limiting which requesters may be deactivated; by default only
+        requesters whose email domain appears in the directory, and whether to
+        remove group members missing from the memberships given to plan()(off
+        by default; only turn it on when those lists are complete)
+    """
+    # arg: FreshPy instance
+    # optional args: workers(integer); deactivate(boolean); scope(function or None);
+    #                remove_members(boolean)
+    def __init__(self, fs, workers=8, deactivate=False, scope=None, remove_members=False):
+        self.fs = fs
+        self.workers = workers
+        self.deactivate = deactivate
+        self.scope = scope
+        self.remove_members = remove_members
+
+
+    #------------------- Plan -------------------#
+    # arg: iterable of requester data dicts with primary_email(see google_user)
+    # optional arg: {group_id: iterable of member emails} for the requester groups to manage;
+    #               members not listed are only removed with remove_members, groups left
+    #               out are not touched
+    # return: SyncPlan
+    def plan(self, users, memberships=None):
+        desired = {}
+        for user in users:
+            desired[normalize_email(user['primary_email'])] = user
+        memberships = memberships or {}
+        with ThreadPoolExecutor(max_workers=1 + len(memberships)) as pool:
+            requesters = self.fs._submit(pool, self.fs.all_requesters)
+            members = {group_id: self.fs._submit(pool, self.fs.requester_group_members, group_id, fields=['id'])
+                       for group_id in memberships}
+            existing = {}
+            for requester in requesters.result():
+                key = normalize_email(requester.get('primary_email'))
+                if(key!=None): existing[key] = requester
+            current = {group_id: {member['id'] for member in future.result()}
+                       for group_id, future in members.items()}
+
+        plan = SyncPlan()
+        for key, user in desired.items():
+            requester = existing.get(key)
+            if(requester==None):
+                plan.creates.append(user)
+                continue
+            plan.emails[requester['id']] = requester['primary_email']
+            changes = {field: value for field, value in user.items()
+                       if field!='primary_email' and requester.get(field)!=value}
+            if(changes): plan.updates.append((requester['id'], changes))
+            if(requester.get('active')==False): plan.reactivations.append(requester['id'])
+
+        if(self.deactivate):
+            scope = self.scope if self.scope!=None else self._domains(desired)
+            for key, requester in existing.items():
+                if(key not in desired and requester.get('active')!=False and scope(requester)):
+                    plan.deactivations.append(requester['id'])
+                    plan.emails[requester['id']] = requester['primary_email']
+
+        for group_id, emails in memberships.items():
+            wanted = {normalize_email(email) for email in emails}
+            ids = set()
+            for key in wanted:
+                if(key in existing): ids.add(existing[key]['id'])
+                elif(key in desired): plan.group_adds.append((group_id, key))  # created first
+            plan.group_adds += [(group_id, rid) for rid in sorted(ids - current[group_id])]
+            if(self.remove_members):
+                plan.group_removals += [(group_id, rid) for rid in sorted(current[group_id] - ids)]
+        return plan
+
+
+    # arg: {normalized email: user}
+    # return: function(requester) -> True if its email domain is one the directory covers
+    def _domains(self, desired):
+        domains = {key.rsplit('@', 1)[-1] for key in desired}
+        return lambda requester: normalize_email(requester.get('primary_email')).rsplit('@', 1)[-1] in domains
+
+
+    #------------------- Apply -------------------#
+    # Requesters are created, updated, reactivated and deactivated concurrently,
+    # then group memberships change once the new requester ids are known
+    # arg: SyncPlan
+    # return: {action: BulkReport}
+    def apply(self, plan):
+        fs = self.fs
+        report = {
+            'creates': fs.bulk_create_requesters(plan.creates, self.workers),
+            'updates': fs.bulk_update_requesters(plan.updates, self.workers),
+            'reactivations': fs._bulk(fs.reactivate_requesters, ((rid,) for rid in plan.reactivations), self.workers),
+            'deactivations': fs._bulk(fs.deactivate_requester, ((rid,) for rid in plan.deactivations), self.workers),
+        }
+        created = {normalize_email(result['primary_email']): result['id'] for args, result in report['creates'].succeeded}
+        adds, skipped = [], BulkReport()
+        for group_id, requester in plan.group_adds:
+            if(isinstance(requester, str)):
+                if(requester not in created):
+                    skipped.failed.append(((group_id, requester), KeyError("requester was not created: " + requester)))
+                    continue
+                requester = created[requester]
+            adds.append((group_id, requester))
+        report['group_adds'] = fs._bulk(fs.add_group_member, adds, self.workers)
+        report['group_adds'].failed += skipped.failed
+        report['group_removals'] = fs._bulk(fs.delete_group_member, plan.group_removals, self.workers)
+        return report
+
+
+    # arg: iterable of requester data dicts
+    # optional args: {group_id: member emails}; dry_run(boolean) to only plan
+    # return: (SyncPlan, {action: BulkReport} or None on a dry run)
+    def sync(self, users, memberships=None, dry_run=False):
+        plan = self.plan(users, memberships)
+        if(dry_run): return plan, None
+        return plan, self.apply(plan)
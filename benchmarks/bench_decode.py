@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+# Compares page decoding paths on a synthetic 100-record asset page with
+# type_fields: the old response.json() path, the configured decoder, field
+# projection and the incremental stream decoder.
+# Run from the repository root: python benchmarks/bench_decode.py
+import json
+import os
+import sys
+import tracemalloc
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from FreshPy import json_loads, iter_json_array, project
+
+FIELDS = ['display_id', 'asset_type_id', 'type_fields.last_login_by_17000000908']
+
+
+# arg: number of records
+# return: page body(bytes) shaped like GET /assets?include=type_fields
+def asset_page(records=100):
+    assets = []
+    for i in range(records):
+        asset = {
+            'id': 17000000000 + i, 'display_id': i, 'name': 'LAPTOP-%05d' % i,
+            'description': 'Staff laptop ' * 8, 'asset_type_id': 17000254 + i % 4,
+            'impact': 'low', 'author_type': 'User', 'usage_type': 'permanent',
+            'asset_tag': 'ASSET-%d' % i, 'user_id': None, 'department_id': 17000080,
+            'location_id': None, 'agent_id': None, 'group_id': None,
+            'assigned_on': None, 'created_at': '2021-12-13T10:00:00Z',
+            'updated_at': '2021-12-16T10:00:00Z',
+        }
+        type_fields = {'field_%d_17000000908' % n: 'value %d' % n for n in range(30)}
+        type_fields['last_login_by_17000000908'] = 'FirstLast%d' % i
+        asset['type_fields'] = type_fields
+        assets.append(asset)
+    return json.dumps({'assets': assets}).encode()
+
+
+# arg: page body(bytes); size(integer)
+# return: generator of byte chunks, like response.iter_content
+def chunked(body, size=16384):
+    for i in range(0, len(body), size):
+        yield body[i:i+size]
+
+
+# arg: label; function to time; repetitions(integer)
+def bench(label, func, repeat=200):
+    func()
+    start = perf_counter()
+    for i in range(repeat): func()
+    per_page = (perf_counter() - start) / repeat * 1000
+    tracemalloc.start()
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print('{0:<34} {1:8.3f} ms/page {2:9.1f} KiB peak'.format(label, per_page, peak / 1024.0))
+    return result
+
+
+def main():
+    body = asset_page()
+    print('page: {0} records, {1:.1f} KiB, decoder: {2}'.format(
+        100, len(body) / 1024.0, json_loads.__module__))
+    bench('response.json() (old path)', lambda: json.loads(body.decode('utf-8'))['assets'])
+    bench('decoder', lambda: json_loads(body)['assets'])
+    bench('decoder + fields', lambda: project(json_loads(body)['assets'], FIELDS))
+    bench('stream + fields', lambda: project(iter_json_array(chunked(body), 'assets'), FIELDS))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+# FreshPy benchmark suite against the local mock server
+# Reports throughput, per-request latency percentiles and peak Python memory
+# for the collection pulls, single-record reads and bulk updates.
+#   python benchmarks/bench_freshpy.py --records 5000 --latency 0.02
+#   python benchmarks/bench_freshpy.py --json > bench.json   # keep for comparisons
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from FreshPy import FreshPy, where
+from mock_freshservice import MockFreshService
+
+
+# arg: sorted list of numbers; percentile(0-100)
+# return: value at that percentile
+def percentile(values, pct):
+    if(not values): return 0.0
+    index = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+# arg: base URL; FreshPy keyword args
+# return: (FreshPy instance, list the per-request latencies are appended to)
+def client(base, **kwargs):
+    fs = FreshPy('benchmark', base, **kwargs)
+    latencies = []
+    fs.session.hooks['response'].append(lambda r, *a, **kw: latencies.append(r.elapsed.total_seconds()))
+    return fs, latencies
+
+
+# Each scenario takes (base URL, records) and returns (FreshPy latency list, items handled)
+def scenario_list_assets(base, records, workers=None):
+    fs, latencies = client(base, pool_size=max(10, workers or 1))
+    return latencies, len(fs.list_assets(type_fields=True, workers=workers))
+
+
+# one of the mock's five asset types, so a fifth of the assets
+def scenario_filter_assets(base, records):
+    fs, latencies = client(base)
+    return latencies, len(fs.list_assets(type_fields=True, query=where(asset_type_id=17000001)))
+
+
+def scenario_all_tickets(base, records):
+    fs, latencies = client(base)
+    return latencies, len(fs.all_tickets())
+
+
+def scenario_all_requesters(base, records):
+    fs, latencies = client(base)
+    return latencies, len(fs.all_requesters())
+
+
+def scenario_view_ticket(base, records, cache=None):
+    fs, latencies = client(base, cache=cache)
+    calls = min(records, 500)
+    for i in range(calls):
+        fs.view_ticket(1 + i % 50)
+    return latencies, calls
+
+
+def scenario_bulk_update_assets(base, records):
+    fs, latencies = client(base, pool_size=8)
+    calls = min(records, 500)
+    report = fs.bulk_update_assets(((1 + i, {'user_id': 1 + i}) for i in range(calls)), workers=8)
+    return latencies, len(report.succeeded)
+
+
+SCENARIOS = [
+    ('list_assets(type_fields)', scenario_list_assets, {}),
+    ('list_assets(workers=4)', scenario_list_assets, {'workers': 4}),
+    ('list_assets(query)', scenario_filter_assets, {}),
+    ('all_tickets', scenario_all_tickets, {}),
+    ('all_requesters', scenario_all_requesters, {}),
+    ('view_ticket x500', scenario_view_ticket, {}),
+    ('view_ticket x500 cached', scenario_view_ticket, {'cache': True}),
+    ('bulk_update_assets x500', scenario_bulk_update_assets, {}),
+]
+
+
+# arg: scenario function and kwargs; mock options; measure memory(boolean)
+# return: result dict
+def run(func, kwargs, records, latency, rate_limit, memory):
+    mock = MockFreshService(records, latency, rate_limit)
+    base = mock.start()
+    try:
+        start = perf_counter()
+        latencies, items = func(base, records, **kwargs)
+        elapsed = perf_counter() - start
+        peak = None
+        if(memory):
+            tracemalloc.start()
+            func(base, records, **kwargs)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    finally:
+        mock.stop()
+    latencies.sort()
+    return {
+        'items': items, 'requests': len(latencies), 'seconds': elapsed,
+        'items_per_s': items / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000, 'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'peak_kib': peak / 1024.0 if peak!=None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark FreshPy against the mock FreshService server')
+    parser.add_argument('--records', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.005, help='mock seconds per request')
+    parser.add_argument('--rate-limit', type=int, default=None, help='mock requests per minute')
+    parser.add_argument('--only', default=None, help='run scenarios whose name contains this')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--json', action='store_true', help='print results as json')
+    args = parser.parse_args()
+
+    results = {}
+    for name, func, kwargs in SCENARIOS:
+        if(args.only!=None and args.only not in name): continue
+        results[name] = run(func, kwargs, args.records, args.latency, args.rate_limit, not args.no_memory)
+        if(not args.json):
+            r = results[name]
+            peak = '{:9.1f} KiB'.format(r['peak_kib']) if r['peak_kib']!=None else ''
+            print('{0:<26} {1:6d} items {2:5d} req {3:7.2f}s {4:9.1f}/s  p50 {5:6.1f}ms p95 {6:6.1f}ms p99 {7:6.1f}ms {8}'.format(
+                name, r['items'], r['requests'], r['seconds'], r['items_per_s'],
+                r['p50_ms'], r['p95_ms'], r['p99_ms'], peak))
+    if(args.json): print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
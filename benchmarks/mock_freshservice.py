@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+
+# Local mock of the FreshService API V2 for benchmarks and dry runs
+# Emulates link header pagination, X-RateLimit-* headers with 429/Retry-After,
+# ETags, updated_since on tickets, configurable latency and injected 5xx errors,
+# with ticket/asset/requester/agent payloads shaped like the real API.
+#   python benchmarks/mock_freshservice.py --port 8000 --records 5000 --latency 0.05
+#   FreshPy('any-key', 'http://127.0.0.1:8000')
+import argparse
+import json
+import random
+import re
+import threading
+import zlib
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from time import sleep, monotonic
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+# collection: json key for one record
+SINGULAR = {
+    'tickets': 'ticket', 'assets': 'asset', 'requesters': 'requester', 'agents': 'agent',
+    'asset_types': 'asset_type', 'departments': 'department', 'groups': 'group',
+    'roles': 'role', 'products': 'product', 'vendors': 'vendor',
+    'requester_groups': 'requester_group', 'canned_responses': 'canned_response',
+    'canned_response_folders': 'canned_response_folder',
+}
+LOGIN_FIELD = 'last_login_by_17000000908'
+
+
+# Evaluates FreshService filter syntax: field:value, field:>value, field:<value,
+# joined with AND/OR and parentheses
+# arg: query string(surrounding double quotes optional)
+# return: function(record) -> boolean
+def compile_filter(text):
+    tokens = re.findall(r"\(|\)|AND|OR|[\w.]+:[<>]?(?:'(?:[^'\\]|\\.)*'|[^\s()]+)", text.strip().strip('"'))
+    position = [0]
+    def peek():
+        return tokens[position[0]] if position[0] < len(tokens) else None
+    def take():
+        position[0] += 1
+        return tokens[position[0] - 1]
+    def condition():
+        token = take()
+        if(token=='('):
+            result = expression()
+            take()
+            return result
+        name, value = token.split(':', 1)
+        op = value[0] if value[:1] in ('<', '>') else ''
+        value = value[len(op):]
+        if(value.startswith("'")): value = value[1:-1].replace("\\'", "'")
+        elif(value in ('true', 'false')): value = value=='true'
+        elif(value=='null'): value = None
+        else: value = float(value) if '.' in value else int(value)
+        def test(record):
+            actual = record.get(name)
+            if(op==''): return actual==value
+            if(actual==None): return False
+            if(isinstance(value, str)): actual = str(actual)[:len(value)]
+            return actual >= value if op=='>' else actual <= value
+        return test
+    def conjunction():
+        tests = [condition()]
+        while(peek()=='AND'):
+            take()
+            tests.append(condition())
+        return lambda record: all(test(record) for test in tests)
+    def expression():
+        tests = [conjunction()]
+        while(peek()=='OR'):
+            take()
+            tests.append(conjunction())
+        return lambda record: any(test(record) for test in tests)
+    return expression()
+
+
+# arg: datetime
+# return: FreshService style timestamp
+def stamp(when):
+    return when.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class MockFreshService():
+    """
+        In-process mock server. start() returns the base URL to give FreshPy
+        Optional: records per large collection, latency(seconds per request),
+        rate_limit(requests per minute, None for unlimited), error_rate(share of 5xx)
+    """
+    def __init__(self, records=1000, latency=0.0, rate_limit=None, error_rate=0.0, seed=1):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.window = (monotonic(), 0)
+        self.data = self._generate(records)
+        self.server = None
+
+
+    #------------------- Payloads -------------------#
+    def _generate(self, records):
+        base = datetime(2021, 12, 1, tzinfo=timezone.utc)
+        data = {name: {} for name in SINGULAR}
+        for i in range(1, 6):
+            data['asset_types'][17000000 + i] = {'id': 17000000 + i, 'name': ['Laptop', 'Desktop', 'Chromebook', 'Monitor', 'Printer'][i-1],
+                                                 'parent_asset_type_id': None, 'visible': True,
+                                                 'created_at': stamp(base), 'updated_at': stamp(base)}
+        for name in ('departments', 'groups', 'roles', 'products', 'vendors', 'requester_groups',
+                     'canned_responses', 'canned_response_folders'):
+            for i in range(1, 11):
+                record_id = 17000100 + i
+                data[name][record_id] = {'id': record_id, 'name': '{0} {1}'.format(name[:-1].title(), i),
+                                         'description': None, 'created_at': stamp(base), 'updated_at': stamp(base)}
+        for i in range(1, records + 1):
+            updated = stamp(base + timedelta(minutes=i))
+            first, last = 'First{}'.format(i), 'Last{}'.format(i)
+            data['requesters'][i] = {
+                'id': i, 'first_name': first, 'last_name': last, 'job_title': None,
+                'primary_email': '{0}.{1}@example.org'.format(first, last).lower(),
+                'secondary_emails': [], 'work_phone_number': None, 'mobile_phone_number': None,
+                'department_ids': [17000101 + i % 10], 'can_see_all_tickets_from_associated_departments': False,
+                'reporting_manager_id': None, 'address': None, 'time_zone': 'Eastern Time (US & Canada)',
+                'language': 'en', 'location_id': None, 'background_information': None,
+                'custom_fields': {}, 'active': True, 'has_logged_in': False,
+                'created_at': stamp(base), 'updated_at': updated,
+            }
+            data['tickets'][i] = {
+                'id': i, 'subject': 'Ticket {}'.format(i), 'group_id': 17000101 + i % 10,
+                'department_id': 17000101 + i % 10, 'category': None, 'sub_category': None,
+                'item_category': None, 'requester_id': i, 'responder_id': None,
+                'due_by': updated, 'fr_escalated': False, 'deleted': False, 'spam': False,
+                'email_config_id': None, 'fwd_emails': [], 'reply_cc_emails': [], 'cc_emails': [],
+                'is_escalated': False, 'fr_due_by': updated, 'priority': 1 + i % 4, 'status': 2 + i % 4,
+                'source': 2, 'created_at': stamp(base), 'updated_at': updated, 'to_emails': None,
+                'type': 'Incident', 'description': '<div>Ticket body {}</div>'.format(i),
+                'description_text': 'Ticket body {}'.format(i), 'custom_fields': {},
+            }
+            data['assets'][i] = {
+                'id': 17000000000 + i, 'display_id': i, 'name': 'ASSET-{:05d}'.format(i),
+                'description': None, 'asset_type_id': 17000001 + i % 5, 'impact': 'low',
+                'author_type': 'User', 'usage_type': 'permanent', 'asset_tag': 'TAG-{}'.format(i),
+                'user_id': None, 'department_id': 17000101 + i % 10, 'location_id': None,
+                'agent_id': None, 'group_id': None, 'assigned_on': None,
+                'created_at': stamp(base), 'updated_at': updated,
+                'type_fields': dict([('product_17000000908', 17000101), ('vendor_17000000908', None),
+                                     ('serial_number_17000000908', 'SN{:08d}'.format(i)),
+                                     (LOGIN_FIELD, '{0}{1}'.format(first, last))]),
+            }
+        for i in range(1, max(2, records // 20) + 1):
+            data['agents'][i] = {
+                'id': i, 'first_name': 'Agent{}'.format(i), 'last_name': 'Staff',
+                'email': 'agent{}@example.org'.format(i), 'active': True, 'occasional': False,
+                'department_ids': [], 'role_ids': [17000101], 'group_ids': [17000101],
+                'created_at': stamp(base), 'updated_at': stamp(base),
+            }
+        return data
+
+
+    #------------------- Server -------------------#
+    # optional args: host; port(0 picks a free one)
+    # return: base URL
+    def start(self, host='127.0.0.1', port=0):
+        mock = self
+        class Handler(_Handler):
+            service = mock
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return 'http://{0}:{1}'.format(*self.server.server_address)
+
+
+    def stop(self):
+        if(self.server!=None):
+            self.server.shutdown()
+            self.server.server_close()
+
+
+    # Fixed one minute window like FreshService's per-minute limit
+    # return: (allowed, total, remaining, seconds until the window resets)
+    def _spend(self):
+        with self.lock:
+            self.requests += 1
+            if(self.rate_limit==None): return True, None, None, 0
+            start, used = self.window
+            now = monotonic()
+            if(now - start >= 60): start, used = now, 0
+            allowed = used < self.rate_limit
+            if(allowed): used += 1
+            self.window = (start, used)
+            return allowed, self.rate_limit, self.rate_limit - used, max(1, int(60 - (now - start)) + 1)
+
+
+    # arg: method; path; query dict; json body
+    # return: (status, payload or None, next page path or None)
+    def handle(self, method, path, query, body):
+        if(path=='/api/v2/tickets/filter'):
+            if('query' not in query): return 400, {'description': 'query is required'}, None
+            with self.lock:
+                return self._list('tickets', list(self.data['tickets'].values()), query, path)
+        match = re.match(r'^/api/v2/(\w+)(?:/(\d+))?(?:/(\w+)(?:/(\d+))?)?$', path)
+        if(match==None): return 404, {'description': 'Not found'}, None
+        name, record_id, action, member = match.groups()
+        if(name=='solutions'): return 200, {'categories': [], 'folders': []}, None
+        if(name=='requester_fields' or name=='agent_fields'): return 200, {name: []}, None
+        if(name not in SINGULAR): return 404, {'description': 'Not found'}, None
+        records = self.data[name]
+        with self.lock:
+            if(record_id==None):
+                if(method=='POST'): return 201, {SINGULAR[name]: self._create(records, body)}, None
+                return self._list(name, list(records.values()), query, path)
+            record_id = int(record_id)
+            if(record_id not in records): return 404, {'description': 'Not found'}, None
+            if(action=='members'):
+                members = [r for r in self.data['requesters'].values() if r['id'] % 10==record_id % 10]
+                return self._list('requesters', members, query, path)
+            record = records[record_id]
+            if(method=='GET'):
+                if(name=='assets' and query.get('include')!='type_fields'):
+                    record = {k: v for k, v in record.items() if k!='type_fields'}
+                return 200, {SINGULAR[name]: record}, None
+            if(method=='PUT'):
+                if(body): self._merge(record, body)
+                record['updated_at'] = stamp(datetime.now(timezone.utc))
+                return 200, {SINGULAR[name]: record}, None
+            if(method=='DELETE'):
+                del records[record_id]
+                return 204, None, None
+        return 405, {'description': 'Method not allowed'}, None
+
+
+    def _create(self, records, body):
+        record = dict(body or {})
+        record['id'] = max(records, default=0) + 1
+        record['created_at'] = record['updated_at'] = stamp(datetime.now(timezone.utc))
+        records[record['id']] = record
+        return record
+
+
+    def _merge(self, record, body):
+        for key, value in body.items():
+            if(isinstance(value, dict) and isinstance(record.get(key), dict)): record[key].update(value)
+            else: record[key] = value
+
+
+    def _list(self, name, records, query, path):
+        if(name=='tickets' and 'updated_since' in query):
+            records = [r for r in records if r['updated_at'] >= query['updated_since']]
+        for param in ('query', 'filter'):
+            if(param in query):
+                test = compile_filter(query[param])
+                records = [r for r in records if test(r)]
+        per_page = min(100, int(query.get('per_page', 30)))
+        page = int(query.get('page', 1))
+        chunk = records[(page - 1) * per_page:page * per_page]
+        if(name=='assets' and query.get('include')!='type_fields'):
+            chunk = [{k: v for k, v in r.items() if k!='type_fields'} for r in chunk]
+        next_page = None
+        if(page * per_page < len(records)):
+            rest = {k: v for k, v in query.items() if k not in ('page', 'per_page')}
+            extra = '&' + urlencode(rest) if rest else ''
+            next_page = '{0}?per_page={1}&page={2}{3}'.format(path, per_page, page + 1, extra)
+        return 200, {'requesters' if path.endswith('/members') else name: chunk}, next_page
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+    service = None
+
+
+    def log_message(self, *args):
+        pass
+
+
+    def _serve(self):
+        service = self.service
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        if(service.latency): sleep(service.latency)
+        allowed, total, remaining, reset = service._spend()
+        headers = {}
+        if(total!=None):
+            headers = {'X-RateLimit-Total': total, 'X-RateLimit-Remaining': remaining,
+                       'X-RateLimit-Used-CurrentRequest': 1}
+        if(not allowed):
+            headers['Retry-After'] = reset
+            return self._send(429, {'description': 'Rate limit exceeded'}, headers)
+        if(service.error_rate and service.random.random() < service.error_rate):
+            return self._send(503, {'description': 'Service unavailable'}, headers)
+        parts = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        try:
+            body = json.loads(raw) if raw else None
+        except(ValueError):
+            return self._send(400, {'description': 'Invalid json'}, headers)
+        status, payload, next_page = service.handle(self.command, parts.path, query, body)
+        if(next_page!=None):
+            headers['link'] = '<http://{0}{1}>; rel="next"'.format(self.headers['Host'], next_page)
+        self._send(status, payload, headers)
+
+
+    def _send(self, status, payload, headers):
+        body = json.dumps(payload).encode() if payload!=None else b''
+        etag = '"{:x}"'.format(zlib.crc32(body))
+        if(status==200 and self.command=='GET' and self.headers.get('If-None-Match')==etag):
+            status, body = 304, b''
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, str(value))
+        if(status in (200, 304) and self.command=='GET'): self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _serve
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock FreshService API V2 server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--records', type=int, default=1000, help='tickets, assets and requesters to generate')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    parser.add_argument('--rate-limit', type=int, default=None, help='requests per minute')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with 503')
+    args = parser.parse_args()
+    mock = MockFreshService(args.records, args.latency, args.rate_limit, args.error_rate)
+    print('Mock FreshService at ' + mock.start(args.host, args.port))
+    try:
+        threading.Event().wait()
+    except(KeyboardInterrupt):
+        mock.stop()
+
+
+if __name__ == '__main__':
+    main()
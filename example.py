@@ -6,7 +6,7 @@
 # Put FreshPy.py in same directory as script to import
 from FreshPy import *
 
-# Initiates FreshPy class. Downloads all assets and filters for "Laptop" product type.
+# Initiates FreshPy class. Downloads the assets of the "Laptop" product type.
 # Downloads all requesters from a specific requester group and then assigns assets to
 # requesters according to last login on asset
 def main():
@@ -15,30 +15,20 @@ def main():
     FreshService_domain = 'https://customdomain.freshservice.com'
     FS = FreshPy(api_key, FreshService_domain)
 
-    # download asset types
-    types = FS.list_asset_types()
-    for type in types:
-        # filter for Laptops product type
-        if(type['name']=='Laptop'):
-            laptop_id = type['id']
+    # look up Laptop asset type id from the memoized asset types
+    laptop_id = FS.catalog.ids('asset_types')['Laptop']
 
-    #dowload all assets
-    assets = FS.list_assets(type_fields=True)
-    laptops = []
-    for asset in assets:
-        # filter for Laptops product type
-        if(asset['asset_type_id']==laptop_id):
-            laptops.append(asset)
+    # download only Laptops; the filter runs server side
+    laptops = FS.list_assets(type_fields=True, query=where(asset_type_id=laptop_id))
 
     # download staff
     # domain specific group ID; needs to be changed if running on different domain
     staff = FS.requester_group_members(17000056500)
     
-    # interate through laptops to set Used By field for asset
-    for laptop in laptops:
-        print(laptop['name'])
-        FS.lastUser2usedBy_staff(laptop, staff)
-        sleep(1)
+    # set Used By field for every laptop from its last login in one pass;
+    # laptops already assigned to the right requester are skipped
+    report = FS.assign_last_users(laptops, staff, by='name')
+    print(report)
 
         
 if __name__ == '__main__':
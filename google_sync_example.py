@@ -15,6 +15,7 @@ from googleapiclient.discovery import build
 
 # import FreshPy module
 from FreshPy import *
+from FreshSync import DirectorySync, google_user
 
 # If modifying these scopes, delete the file token.json.
 SCOPES = ['https://www.googleapis.com/auth/admin.directory.user']
@@ -80,61 +81,34 @@ def main():
         if('student' in orgUnit):
             students.append(user)
 
-    # get all FreshService requesters
-    all_requesters = FS.all_requesters()
-
-    # figure out which student accounts are already created
-    student_emails = []
-    for student in students:
-        student_emails.append(student['primaryEmail'].lower())
-
-    found_students = []
-    for requester in all_requesters:
-        if(str(requester['primary_email']).lower() in student_emails):
-            found_students.append(requester['primary_email'])
-
-    # figure out which staff accounts are already created
-    staff_emails = []
-    for s in staff:
-        staff_emails.append(s['primaryEmail'].lower())
-
-    found_staff = []
-    for requester in all_requesters:
-        if(str(requester['primary_email']).lower() in staff_emails):
-            found_staff.append(requester['primary_email'])
-
-    # create lists of google users who need to be created
-    not_found_staff = []
-    for s in staff:
-        if(s['primaryEmail'] not in found_staff):
-            not_found_staff.append(s)
-
-    not_found_students = []
-    for s in students:
-        if(s['primaryEmail'] not in found_students):
-            not_found_students.append(s)
-
-    # create FreshService users and add to proper requester group
+    # FreshService requester groups for each org unit
     FS_students = 17000090911
     FS_staff = 17000056500
-    for user in not_found_staff:
-        new_requester = {
-            'first_name': user['givenName'],
-            'last_name': user['familyName'],
-            'primary_email': user['primaryEmail']
-        }
-        u = FS.create_requester(new_requester)
-        FS.add_groupMember(FS_staff, u['id'])
-
-    for user in not_found_students:
-        new_requester = {
-            'first_name': user['givenName'],
-            'last_name': user['familyName'],
-            'primary_email': user['primaryEmail']
-        }
-        u = FS.create_requester(new_requester)
-        FS.add_groupMember(FS_students, u['id'])
-
-        
+    memberships = {
+        FS_staff: [user['primaryEmail'] for user in staff],
+        FS_students: [user['primaryEmail'] for user in students],
+    }
+
+    # compare both sides by normalized email: create missing requesters, update
+    # changed names and add missing group members. Requesters missing from the
+    # directory are only deactivated with DirectorySync(FS, deactivate=True),
+    # and then plan() must get every directory user, not just staff and students.
+    # Likewise members missing from memberships are only removed from the
+    # groups with DirectorySync(FS, remove_members=True)
+    sync = DirectorySync(FS)
+    plan = sync.plan([google_user(user) for user in staff + students], memberships)
+    print(plan)
+    for line in plan.describe():
+        print(line)
+
+    # apply concurrently; comment out for a dry run
+    report = sync.apply(plan)
+    for action, result in report.items():
+        print(action, result)
+        for args, error in result.failed:
+            print('  ', args, error)
+    # single calls use add_group_member, e.g. FS.add_group_member(FS_staff, requester_id)
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+# apply_assets and assign_last_users with the reads and writes stubbed
+#   python -m pytest tests
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from FreshPy import FreshPy, LAST_LOGIN_FIELD
+
+try:
+    import httpx
+    from AsyncFreshPy import AsyncFreshPy
+except(ImportError):
+    httpx = None
+
+REQUESTERS = [{'id': 7, 'primary_email': 'ann@school.org'}, {'id': 8, 'primary_email': 'bob@school.org'}]
+
+
+def assets():
+    return [{'display_id': 1, 'user_id': 7, 'type_fields': {LAST_LOGIN_FIELD: 'ann@school.org'}},
+            {'display_id': 2, 'user_id': None, 'type_fields': {LAST_LOGIN_FIELD: 'bob@school.org'}},
+            {'display_id': 3, 'user_id': None, 'type_fields': {}}]
+
+
+class TestApply(unittest.TestCase):
+    def setUp(self):
+        self.fs = FreshPy('key', 'example')
+        self.updates, self.views = [], []
+        self.fs.update_asset = lambda display_id, data: self.updates.append((display_id, data)) or data
+        self.fs.view_asset = lambda display_id, type_fields=False: self.views.append(display_id) or {}
+
+
+    def test_index_is_used_for_string_ids(self):
+        # bulk-update passes ids read from a CSV and one {display_id: asset} index for every chunk
+        index = {asset['display_id']: asset for asset in assets()}
+        self.fs.apply_assets([('1', {'user_id': 7}), ('2', {'user_id': 8})], index)
+        self.fs.apply_assets([('3', {'user_id': 8})], index)
+        self.assertEqual(self.views, [])
+        self.assertEqual(self.updates, [('2', {'user_id': 8}), ('3', {'user_id': 8})])
+
+
+    def test_assign_last_users_from_generator(self):
+        report = self.fs.assign_last_users(iter(assets()), REQUESTERS, by='email')
+        self.assertEqual(self.updates, [(2, {'user_id': 8})])
+        self.assertEqual(report.skipped, [(1, {'user_id': 7})])
+
+
+@unittest.skipIf(httpx==None, "AsyncFreshPy requires httpx")
+class TestAsyncApply(unittest.TestCase):
+    def test_assign_last_users_from_async_generator(self):
+        async def run():
+            fs = AsyncFreshPy('key', 'example')
+            updates = []
+            async def update_asset(display_id, data):
+                updates.append((display_id, data))
+                return data
+            async def iter_assets():
+                for asset in assets():
+                    yield asset
+            fs.update_asset = update_asset
+            report = await fs.assign_last_users(iter_assets(), REQUESTERS, by='email')
+            return updates, report
+        updates, report = asyncio.run(run())
+        self.assertEqual(updates, [(2, {'user_id': 8})])
+        self.assertEqual(report.skipped, [(1, {'user_id': 7})])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+# ResponseCache on a FreshPy instance against benchmarks/mock_freshservice.py
+#   python -m pytest tests
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(HERE, '..'), os.path.join(HERE, '..', 'benchmarks')]
+from FreshPy import FreshPy, ResponseCache
+from mock_freshservice import MockFreshService
+
+
+class TestResponseCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.mock = MockFreshService(50)
+        cls.base = cls.mock.start()
+
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mock.stop()
+
+
+    def client(self, ttl):
+        self.statuses = []
+        fs = FreshPy('key', self.base, cache=ResponseCache(ttl=ttl),
+                     hooks=[lambda event: self.statuses.append(event['status'])])
+        self.addCleanup(fs.close)
+        return fs
+
+
+    def test_fresh_entry_is_served_without_a_request(self):
+        fs = self.client(ttl=60)
+        first = fs.view_requester(id=5)
+        self.assertEqual(fs.view_requester(id=5), first)
+        self.assertEqual(self.statuses, [200])
+
+
+    def test_stale_entry_is_revalidated(self):
+        fs = self.client(ttl=0)
+        first = fs.view_requester(id=5)
+        self.assertEqual(fs.view_requester(id=5), first)
+        self.assertEqual(self.statuses, [200, 304])
+
+
+    def test_write_drops_the_entry(self):
+        fs = self.client(ttl=60)
+        fs.view_requester(id=6)
+        fs.update_requester(6, {'job_title': 'Librarian'})
+        self.assertEqual(fs.view_requester(id=6)['job_title'], 'Librarian')
+        self.assertEqual(self.statuses, [200, 200, 200])
+
+
+    def test_list_pages_are_not_cached(self):
+        fs = self.client(ttl=60)
+        fs.all_requesters()
+        fs.all_requesters()
+        self.assertEqual(self.statuses, [200, 200])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+# Checkpointed pulls against benchmarks/mock_freshservice.py, started in-process
+#   python -m pytest tests
+import os
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(HERE, '..'), os.path.join(HERE, '..', 'benchmarks')]
+from FreshPy import FreshPy, Checkpoint
+from mock_freshservice import MockFreshService
+
+
+class TestCheckpoint(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.mock = MockFreshService(250)
+        cls.base = cls.mock.start()
+
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mock.stop()
+
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'requesters.ckpt')
+        self.fs = FreshPy('key', self.base)
+
+
+    def tearDown(self):
+        self.fs.close()
+        self.dir.cleanup()
+
+
+    def test_interrupted_pull_resumes(self):
+        expected = [r['id'] for r in self.fs.iter_requesters()]
+        pull = self.fs.iter_requesters(checkpoint=self.path)
+        first = [next(pull)['id'] for i in range(100)]  # stop after the first page
+        pull.close()
+        self.assertEqual(len(list(Checkpoint(self.path).pages())), 1)
+
+        before = self.mock.requests
+        ids = [r['id'] for r in self.fs.iter_requesters(checkpoint=self.path)]
+        self.assertEqual(ids, expected)
+        self.assertEqual(ids[:100], first)
+        self.assertEqual(self.mock.requests - before, 2)  # pages 2 and 3 only
+        self.assertFalse(os.path.exists(self.path))
+
+
+    def test_finished_pull_starts_over(self):
+        first = list(self.fs.iter_requesters(checkpoint=self.path))
+        before = self.mock.requests
+        again = list(self.fs.iter_requesters(checkpoint=self.path))
+        self.assertEqual(again, first)
+        self.assertEqual(self.mock.requests - before, 3)
+
+
+    def test_partly_written_line_is_ignored(self):
+        checkpoint = Checkpoint(self.path)
+        checkpoint.save([{'id': 1}], 'next-page')
+        with open(self.path, 'a') as f:
+            f.write('{"next": "cut off')
+        self.assertEqual(list(checkpoint.pages()), [([{'id': 1}], 'next-page')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+
+# What `from FreshPy import *` brings into a script, as example.py uses it
+#   python -m pytest tests
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+class TestStarImport(unittest.TestCase):
+    def test_keeps_script_time_module(self):
+        script = {}
+        exec('import time\nfrom FreshPy import *', script)
+        self.assertTrue(callable(script['time'].time))
+        self.assertTrue(callable(script['sleep']))
+        self.assertIn('FreshPy', script)
+        self.assertIn('SharedRateLimiter', script)
+
+
+if __name__ == '__main__':
+    unittest.main()
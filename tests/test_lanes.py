@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+# Scheduler lanes, and lanes reaching worker threads and keeping concurrent
+# GETs of different lanes apart
+#   python -m pytest tests
+import os
+import sys
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from FreshPy import FreshPy, RateLimiter, Scheduler
+from FreshSnapshot import snapshot
+from FreshSync import DirectorySync
+
+
+class TestLanes(unittest.TestCase):
+    def setUp(self):
+        self.fs = FreshPy('key', 'example')
+        self.lanes = []
+
+
+    def record(self, *args, **kwargs):
+        self.lanes.append(self.fs._lane())
+        return []
+
+
+    def test_snapshot_and_sync_threads_keep_the_lane(self):
+        self.fs.all_roles = self.record
+        self.fs.all_requesters = self.record
+        self.fs.requester_group_members = self.record
+        with self.fs.lane('bulk'):
+            snapshot(self.fs, ['roles'])
+            DirectorySync(self.fs).plan([], {1: []})
+        self.assertEqual(self.lanes, ['bulk'] * 3)
+
+
+    def test_coalescing_is_per_lane(self):
+        # both lanes must be inside the request at once for the barrier to open
+        started, calls = threading.Barrier(3, timeout=5), []
+        def slow(uri):
+            calls.append(self.fs._lane())
+            started.wait()
+            return uri
+        self.fs._get_cached = slow
+        def get(lane):
+            with self.fs.lane(lane):
+                return self.fs._get('uri')
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [self.fs._submit(pool, get, 'interactive'), self.fs._submit(pool, get, 'bulk')]
+            started.wait()
+            self.assertEqual([f.result() for f in futures], ['uri', 'uri'])
+        self.assertEqual(sorted(calls), ['bulk', 'interactive'])
+
+
+class TestScheduler(unittest.TestCase):
+    def test_bulk_leaves_a_share_to_interactive(self):
+        limiter = RateLimiter(100, margin=0)
+        limiter.clock = lambda: 0.0
+        scheduler = Scheduler(limiter)
+        waits = [scheduler.acquire('bulk') for i in range(80)]
+        self.assertEqual(waits, [0.0] * 80)
+        self.assertGreater(limiter.poll(share=scheduler.lane('bulk')[1]), 0)  # bulk would wait now
+        self.assertEqual(scheduler.acquire('interactive'), 0.0)
+
+
+    def test_lane_caps_requests_in_flight(self):
+        scheduler = Scheduler(RateLimiter(), {'bulk': (2, 1.0)})
+        scheduler.enter('bulk')
+        scheduler.enter('bulk')
+        entered = threading.Event()
+        third = threading.Thread(target=lambda: (scheduler.enter('bulk'), entered.set()))
+        third.start()
+        self.assertFalse(entered.wait(0.2))
+        scheduler.leave('bulk')
+        self.assertTrue(entered.wait(5))
+        third.join()
+
+
+    def test_unknown_lane(self):
+        with self.assertRaises(ValueError):
+            Scheduler(RateLimiter()).acquire('batch')
+
+
+    def test_limiter_must_be_the_schedulers(self):
+        with self.assertRaises(ValueError):
+            FreshPy('key', 'example', limiter=RateLimiter(), scheduler=Scheduler(RateLimiter()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+# FreshMirror incremental and full syncs against stubbed FreshPy iterators
+#   python -m pytest tests
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from FreshPy import FreshPy
+from FreshMirror import FreshMirror
+
+
+class FakeFS(FreshPy):
+    def __init__(self):
+        super().__init__('key', 'example')
+        self.assets = {1: {'id': 1, 'display_id': 1, 'name': 'a', 'updated_at': '2024-05-01T10:00:00Z'},
+                       2: {'id': 2, 'display_id': 2, 'name': 'b', 'updated_at': '2024-05-02T10:00:00Z'}}
+        self.queries = []
+
+
+    def iter_assets(self, type_fields=False, per_page=100, workers=None, checkpoint=None, fields=None, query=None):
+        self.queries.append(str(query) if query!=None else None)
+        since = str(query)[len("updated_at:>'"):-1] if query!=None else ''
+        return iter([a for a in self.assets.values() if a['updated_at'][:10] >= since])
+
+
+class TestMirror(unittest.TestCase):
+    def setUp(self):
+        self.fs = FakeFS()
+        self.mirror = FreshMirror(self.fs, ':memory:')
+
+
+    def tearDown(self):
+        self.mirror.close()
+
+
+    def test_assets_sync_from_high_water(self):
+        self.assertEqual(self.mirror.sync(['assets'])['assets']['inserted'], 2)
+        self.fs.assets[1] = dict(self.fs.assets[1], name='a2', updated_at='2024-05-03T09:00:00Z')
+        stats = self.mirror.sync(['assets'])['assets']
+        self.assertEqual(self.fs.queries, [None, "updated_at:>'2024-05-02'"])
+        self.assertEqual((stats['updated'], stats['unchanged'], stats['deleted']), (1, 1, 0))
+        self.assertEqual(self.mirror.get('assets', 1)['name'], 'a2')
+        self.assertEqual(self.mirror.high_water('assets'), '2024-05-03T09:00:00Z')
+
+
+    def test_full_listing_drops_deleted(self):
+        self.mirror.sync(['assets'])
+        del self.fs.assets[2]
+        self.assertEqual(self.mirror.sync(['assets'])['assets']['deleted'], 0)  # filtered pull
+        self.assertEqual(self.mirror.sync(['assets'], full=True)['assets']['deleted'], 1)
+        self.assertEqual(self.mirror.get('assets', 2), None)
+        self.mirror.full_sync_days = 0
+        self.mirror.sync(['assets'])
+        self.assertEqual(self.fs.queries[-1], None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+
+# RateLimiter driven by a fake clock against a simulated FreshService budget.
+# Workers are simulated as events, so minutes of rate limited traffic run in
+# milliseconds and the timings are exact.
+#   python -m pytest tests
+import heapq
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from FreshPy import RateLimiter, SharedRateLimiter
+
+
+class Clock():
+    def __init__(self):
+        self.now = 0.0
+
+
+    def __call__(self):
+        return self.now
+
+
+class Server():
+    """
+        Per-minute budget like FreshService and benchmarks/mock_freshservice.py:
+        a window starts at the first request after the last one expired
+    """
+    def __init__(self, limit):
+        self.limit = limit
+        self.start = None
+        self.used = 0
+        self.requests = 0
+        self.rejected = 0
+
+
+    # arg: time the request arrives
+    # return: (accepted, response headers, Retry-After seconds)
+    def spend(self, now):
+        self.requests += 1
+        if(self.start==None or now - self.start >= 60): self.start, self.used = now, 0
+        accepted = self.used < self.limit
+        if(accepted): self.used += 1
+        else: self.rejected += 1
+        headers = {'X-RateLimit-Total': str(self.limit), 'X-RateLimit-Remaining': str(self.limit - self.used),
+                   'X-RateLimit-Used-CurrentRequest': '1'}
+        return accepted, headers, max(1, int(60 - (now - self.start)) + 1)
+
+
+# Runs `workers` callers per limiter, each sending requests one after another
+# like FreshPy._request: reserve, wait, send, feed the response back
+# arg: Server; list of RateLimiters(one per process, the same object when shared);
+#      requests per process; workers per process
+# optional args: latency(seconds per request); stagger(seconds between process starts)
+# return: (seconds until the last response, longest single wait)
+def simulate(server, limiters, requests, workers, latency=0.02, stagger=0.0):
+    clock = Clock()
+    for limiter in limiters:
+        limiter.clock = clock
+    events, order = [], [0]
+    def push(at, *event):
+        order[0] += 1
+        heapq.heappush(events, (at, order[0]) + event)
+    left = [requests] * len(limiters)
+    for process in range(len(limiters)):
+        for worker in range(workers):
+            push(process * stagger, process, 'next', None)
+    finished, longest = 0.0, 0.0
+    while(events):
+        at, _, process, action, data = heapq.heappop(events)
+        clock.now = at
+        limiter = limiters[process]
+        if(action=='next'):
+            if(left[process]==0): continue
+            left[process] -= 1
+            action = 'acquire'
+        if(action=='acquire'):
+            wait = limiter.reserve()
+            longest = max(longest, wait)
+            push(at + wait, process, 'send', None)
+        elif(action=='send'):
+            push(at + latency, process, 'reply', (at,) + server.spend(at))
+        elif(action=='reply'):
+            sent, accepted, headers, retry_after = data
+            limiter.update(headers, sent)
+            if(accepted):
+                finished = at
+                push(at, process, 'next', None)
+            else:
+                limiter.retry_after(retry_after)
+                push(at, process, 'acquire', None)
+    return finished, longest
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_full_speed_within_budget(self):
+        server = Server(60)
+        finished, longest = simulate(server, [RateLimiter()], 50, 1)
+        self.assertEqual(server.rejected, 0)
+        self.assertEqual(longest, 0.0)
+        self.assertLess(finished, 1.5)
+
+
+    def test_sequential_past_budget(self):
+        server = Server(60)
+        finished, longest = simulate(server, [RateLimiter()], 70, 1)
+        self.assertEqual(server.rejected, 0)
+        self.assertLess(finished, 61)
+
+
+    def test_concurrent_workers_wait_one_window(self):
+        # 130 requests need three windows: about 120 s, no wait past a window
+        server = Server(60)
+        finished, longest = simulate(server, [RateLimiter()], 130, 8)
+        self.assertEqual(server.rejected, 0)
+        self.assertLess(finished, 122)
+        self.assertLessEqual(longest, 60)
+
+        server = Server(30)
+        finished, longest = simulate(server, [RateLimiter()], 40, 4)
+        self.assertEqual(server.rejected, 0)
+        self.assertLess(finished, 62)
+
+
+    def test_requests_before_first_response_are_charged(self):
+        clock = Clock()
+        limiter = RateLimiter()
+        limiter.clock = clock
+        self.assertEqual([limiter.reserve() for i in range(8)], [0.0] * 8)
+        clock.now = 0.5
+        limiter.update({'X-RateLimit-Total': '60', 'X-RateLimit-Remaining': '59'}, sent=0.0)
+        self.assertEqual(limiter.tokens, 52)
+        self.assertEqual(limiter.reset_at, 60.0)
+
+
+    def test_slows_down_within_margin(self):
+        clock = Clock()
+        limiter = RateLimiter(60, margin=3)
+        limiter.clock = clock
+        waits = [limiter.reserve() for i in range(60)]
+        self.assertEqual(waits[:57], [0.0] * 57)
+        self.assertEqual(waits[57:], [15.0, 30.0, 45.0])
+        self.assertEqual(limiter.reserve(), 60.0)  # first request of the next window
+
+
+    def test_remaining_from_previous_window_is_ignored(self):
+        clock = Clock()
+        limiter = RateLimiter(60)
+        limiter.clock = clock
+        limiter.reserve()
+        clock.now = 61.0
+        limiter.reserve()  # new window
+        limiter.update({'X-RateLimit-Remaining': '0'}, sent=59.0)
+        self.assertGreater(limiter.tokens, 50)
+        limiter.update({'X-RateLimit-Remaining': '10'}, sent=61.0)
+        self.assertEqual(limiter.tokens, 10)
+
+
+    def test_retry_after_holds_callers_until_reset(self):
+        clock = Clock()
+        limiter = RateLimiter(60)
+        limiter.clock = clock
+        limiter.retry_after(20)
+        self.assertEqual(limiter.reserve(), 20.0)
+        clock.now = 20.0
+        self.assertEqual(limiter.reserve(), 0.0)
+        self.assertEqual(limiter.reset_at, 80.0)
+
+
+    def test_poll_keeps_budget_for_higher_lanes(self):
+        clock = Clock()
+        limiter = RateLimiter(100, margin=0)
+        limiter.clock = clock
+        taken = 0
+        while(limiter.poll(share=0.8)==0.0):
+            taken += 1
+        self.assertEqual(taken, 80)
+        self.assertEqual(limiter.poll(share=0.8), 60.0)
+        self.assertEqual(limiter.poll(share=1.0), 0.0)
+
+
+class TestSharedRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'budget.db')
+        self.limiters = []
+
+
+    def tearDown(self):
+        for limiter in self.limiters:
+            limiter.close()
+        self.dir.cleanup()
+
+
+    def shared(self):
+        self.limiters.append(SharedRateLimiter(self.path))
+        return self.limiters[-1]
+
+
+    def test_processes_share_one_window(self):
+        # three processes, 25 calls each, starting 20 s apart
+        server = Server(60)
+        finished, longest = simulate(server, [self.shared() for i in range(3)], 25, 1, stagger=20)
+        self.assertEqual(server.rejected, 0)
+        self.assertLess(finished, 61)
+
+        # separate limiters each assume the whole budget is theirs
+        server = Server(60)
+        finished, longest = simulate(server, [RateLimiter() for i in range(3)], 25, 1, stagger=20)
+        self.assertGreater(finished, 90)
+
+
+    def test_retry_after_holds_every_process(self):
+        first, second = self.shared(), self.shared()
+        clock = Clock()
+        first.clock = second.clock = clock
+        first.update({'X-RateLimit-Total': '60', 'X-RateLimit-Remaining': '59'})
+        first.retry_after(30)
+        self.assertEqual(second.reserve(), 30.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
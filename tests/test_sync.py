@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+# DirectorySync.plan() against a FreshPy instance whose reads are stubbed
+#   python -m pytest tests
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from FreshPy import FreshPy
+from FreshSync import DirectorySync
+
+STAFF = 17000056500
+
+
+def fake_fs():
+    fs = FreshPy('key', 'example')
+    fs.all_requesters = lambda: [
+        {'id': 1, 'primary_email': 'Ann@school.org', 'first_name': 'Ann', 'active': True},
+        {'id': 2, 'primary_email': 'bob@school.org', 'first_name': 'Bob', 'active': True},
+        {'id': 3, 'primary_email': 'cy@school.org', 'first_name': 'Cy', 'active': True}]
+    fs.requester_group_members = lambda group_id, fields=None: [{'id': 1}, {'id': 3}]
+    return fs
+
+
+class TestPlan(unittest.TestCase):
+    def setUp(self):
+        self.users = [{'primary_email': 'ann@school.org', 'first_name': 'Ann'},
+                      {'primary_email': 'bob@school.org', 'first_name': 'Robert'}]
+        self.memberships = {STAFF: ['ann@school.org', 'bob@school.org']}
+
+
+    def test_partial_lists_only_add(self):
+        plan = DirectorySync(fake_fs()).plan(self.users, self.memberships)
+        self.assertEqual(plan.updates, [(2, {'first_name': 'Robert'})])
+        self.assertEqual(plan.group_adds, [(STAFF, 2)])
+        self.assertEqual(plan.deactivations, [])
+        self.assertEqual(plan.group_removals, [])
+
+
+    def test_removals_are_opt_in(self):
+        plan = DirectorySync(fake_fs(), deactivate=True, remove_members=True).plan(self.users, self.memberships)
+        self.assertEqual(plan.deactivations, [3])
+        self.assertEqual(plan.group_removals, [(STAFF, 3)])
+
+
+if __name__ == '__main__':
+    unittest.main()